@@ -0,0 +1,209 @@
+import time
+from collections.abc import Callable
+from functools import partial
+
+import neurokit2 as nk
+import numpy as np
+from numpy.typing import NDArray
+from src.common.constants import SAMPLING_FREQUENCY
+from src.common.logger import logger
+from src.data_process.entropy import dv_partition_nd, te_dv, te_dv_approx
+from src.data_process.entropy.kernels import NUMBA_AVAILABLE, set_numba_enabled
+from src.data_process.entropy.utils import get_points_from_range, rank_transform
+from src.data_process.processors.beat_annotation import (
+    DEFAULT_FIND_PEAKS_METHOD,
+    NATIVE_FIND_PEAKS_METHOD,
+    annotate_beats,
+)
+from src.data_process.processors.realtime import RealtimeBaroreflexProcessor
+from src.data_process.processors.streaming import stream_peaks
+from src.data_process.processors.utils import get_hp
+from src.synthetic.functions.linear import generate_bivariate_ar
+from src.synthetic.functions.nonlinear import generate_nonlinear_bivariate_process
+
+_BENCHMARK_SEED = 0
+_BENCHMARK_REPEATS = 3
+_PEAK_TOLERANCE = 1  # samples
+_STREAMING_CHUNK_SECONDS = (10, 200)
+_REALTIME_MAX_BLOCK_LENGTH = 500  # samples
+
+
+def benchmark_dv_kernels(
+    lengths: tuple[int, ...] = (1000, 5000, 20000),
+    dimensions: tuple[int, ...] = (2, 3, 4, 5),
+) -> None:
+    """
+    Compares NumPy and numba implementations of DV partitioning and range counting.
+    Verifies that both give identical partitions and counts, and logs the speedup by N and d.
+    """
+    if not NUMBA_AVAILABLE:
+        logger.warning('numba is not installed, skipping kernels benchmark')
+        return
+
+    rng = np.random.default_rng(_BENCHMARK_SEED)
+    for n in lengths:
+        for d in dimensions:
+            signals = rng.standard_normal((n, d)) + rng.standard_normal((n, 1))
+            data = np.column_stack([rank_transform(signal) for signal in signals.T])
+
+            def partition_and_count(data: np.ndarray = data, d: int = d) -> tuple[list, list[int]]:
+                partitions = dv_partition_nd(data)
+                counts = [get_points_from_range(data[:, 1:], part, ranges=((1, d),)) for part in partitions]
+                return partitions, counts
+
+            set_numba_enabled(False)
+            numpy_time, (numpy_partitions, numpy_counts) = _time_call(partition_and_count)
+            set_numba_enabled(True)
+            partition_and_count()  # JIT compilation for the current dtypes
+            numba_time, (numba_partitions, numba_counts) = _time_call(partition_and_count)
+
+            is_identical = numpy_counts == numba_counts and all(
+                p['N'] == q['N'] and np.array_equal(p['mins'], q['mins']) and np.array_equal(p['maxs'], q['maxs'])
+                for p, q in zip(numpy_partitions, numba_partitions, strict=True)
+            )
+            logger.info(
+                f'N={n:>6} d={d} | partitions: {len(numba_partitions):>5} | numpy: {numpy_time:.3f}s '
+                f'| numba: {numba_time:.3f}s | speedup: {numpy_time / numba_time:.1f}x | identical: {is_identical}'
+            )
+
+
+def benchmark_approximate(lengths: tuple[int, ...] = (5000, 30000, 50000, 100000)) -> None:
+    """
+    Compares the approximate and exact DV transfer entropy on linear and nonlinear bivariate processes,
+    forcing the approximation at every length. Logs both values, the error of the approximation against
+    its reported bound, and the speedup, so the accuracy of `te_dv_approx` can be checked against exact DV.
+    """
+    generators: dict[str, Callable[[int], dict[str, NDArray[np.floating]]]] = {
+        'linear': lambda n: generate_bivariate_ar(n, 0.5, seed=_BENCHMARK_SEED),
+        'nonlinear': lambda n: generate_nonlinear_bivariate_process(n, seed=_BENCHMARK_SEED, b=0.25),
+    }
+    for name, generator in generators.items():
+        for n in lengths:
+            signals = generator(n)
+            exact_time, exact = _time_call(partial(te_dv, signals['y'], signals['x']))
+            approximate_time, approximate = _time_call(
+                partial(te_dv_approx, signals['y'], signals['x'], exact_max_points=0)
+            )
+            error = approximate.value - exact
+            logger.info(
+                f'{name:>9} N={n:>6} | exact: {exact:.4f} ({exact_time:.2f}s) '
+                f'| approximate: {approximate.value:.4f} ({approximate_time:.2f}s) '
+                f'| error: {error:+.4f}, estimated bias: {approximate.bias:+.4f}, bound: {approximate.error_bound:.4f} '
+                f'| speedup: {exact_time / approximate_time:.1f}x'
+            )
+
+
+def benchmark_peak_detection(
+    signals: dict[str, NDArray[np.floating]] | None = None,
+    sampling_rate: int = SAMPLING_FREQUENCY,
+) -> None:
+    """
+    Compares neurokit2 and native Elgendi peak detection (cleaning included) on the signals,
+    by default simulated ABP-like pulse waves of increasing length.
+    Logs throughput in samples per second and the share of neurokit2 peaks found by the native detector.
+    """
+    if signals is None:
+        signals = {f'{duration}s': _simulate_pulse_wave(duration, sampling_rate) for duration in (60, 600, 3600)}
+
+    for name, signal in signals.items():
+        nk_time, nk_peaks = _time_call(
+            lambda signal=signal: annotate_beats(signal, sampling_rate, DEFAULT_FIND_PEAKS_METHOD, use_cache=False)
+        )
+        native_time, native_peaks = _time_call(
+            lambda signal=signal: annotate_beats(signal, sampling_rate, NATIVE_FIND_PEAKS_METHOD, use_cache=False)
+        )
+        n_reference, n_native = len(nk_peaks.systolic_peaks), len(native_peaks.systolic_peaks)
+        matched = _count_matched_peaks(nk_peaks.systolic_peaks, native_peaks.systolic_peaks)
+        logger.info(
+            f'{name:>8} | neurokit2: {len(signal) / nk_time:,.0f} samples/s '
+            f'| native: {len(signal) / native_time:,.0f} samples/s | speedup: {nk_time / native_time:.1f}x '
+            f'| matched peaks: {matched}/{n_reference} (native found {n_native})'
+        )
+
+
+def benchmark_streaming(
+    seeds: tuple[int, ...] = tuple(range(12)),
+    duration: int = 600,
+    sampling_rate: int = SAMPLING_FREQUENCY,
+) -> None:
+    """
+    Checks chunk-wise peak detection (stream_peaks) and RealtimeBaroreflexProcessor against annotate_beats
+    on whole simulated recordings, split into chunks and pushed in blocks of random length.
+    Logs how many HP values differ and by how much, which should be rare and at most 1 sample.
+    """
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        abp = _simulate_abp(duration, sampling_rate, seed)
+        reference_hp = get_hp(annotate_beats(abp, sampling_rate, use_cache=False), sampling_rate)
+
+        chunk_lengths = rng.integers(*(np.array(_STREAMING_CHUNK_SECONDS) * sampling_rate), size=duration)
+        boundaries = np.cumsum(chunk_lengths)
+        chunks = np.split(abp, boundaries[boundaries < len(abp)])
+        blocks = stream_peaks(({'abp': chunk} for chunk in chunks), 'abp', sampling_rate)
+        streamed_hp = np.concatenate([get_hp(block.peaks, sampling_rate) for block in blocks])
+        _log_hp_differences(f'stream seed={seed}', reference_hp, streamed_hp, sampling_rate)
+
+        native_hp = get_hp(annotate_beats(abp, sampling_rate, NATIVE_FIND_PEAKS_METHOD, use_cache=False), sampling_rate)
+        processor = RealtimeBaroreflexProcessor(sampling_rate)
+        realtime_hp, start = [], 0
+        while start < len(abp):
+            end = start + int(rng.integers(1, _REALTIME_MAX_BLOCK_LENGTH))
+            realtime_hp.append(processor.push(abp[start:end], np.zeros(len(abp[start:end])))['hp'])
+            start = end
+        realtime_hp.append(processor.flush()['hp'])
+        _log_hp_differences(f'realtime seed={seed}', native_hp, np.concatenate(realtime_hp), sampling_rate)
+
+
+def _log_hp_differences(
+    name: str, reference_hp: NDArray[np.floating], hp: NDArray[np.floating], sampling_rate: int
+) -> None:
+    if len(hp) != len(reference_hp):
+        logger.warning(f'{name:>16} | beats: {len(hp)} instead of {len(reference_hp)}')
+        return
+    differences = np.abs(hp - reference_hp)
+    logger.info(
+        f'{name:>16} | beats: {len(hp)} | differing HP: {np.count_nonzero(differences)} '
+        f'| max difference: {np.max(differences, initial=0) * sampling_rate:.0f} samples'
+    )
+
+
+def _simulate_abp(duration: int, sampling_rate: int, seed: int) -> NDArray[np.floating]:
+    # the pulse shape of neurokit2's PPG simulation has near-flat peaks, where chunk boundaries matter most
+    ppg = nk.ppg_simulate(
+        duration=duration, sampling_rate=sampling_rate, heart_rate=65, motion_amplitude=0.3, random_state=seed
+    )
+    return 90 + 30 * ppg
+
+
+def _count_matched_peaks(reference: NDArray[np.integer], peaks: NDArray[np.integer]) -> int:
+    if len(reference) == 0 or len(peaks) == 0:
+        return 0
+    right = np.clip(np.searchsorted(peaks, reference), 0, len(peaks) - 1)
+    left = np.clip(right - 1, 0, len(peaks) - 1)
+    distances = np.minimum(np.abs(peaks[right] - reference), np.abs(peaks[left] - reference))
+    return int(np.sum(distances <= _PEAK_TOLERANCE))
+
+
+def _simulate_pulse_wave(duration: int, sampling_rate: int) -> NDArray[np.floating]:
+    rng = np.random.default_rng(_BENCHMARK_SEED)
+    t = np.arange(duration * sampling_rate) / sampling_rate
+    beat_phase = 2 * np.pi * np.cumsum(1.1 + 0.1 * np.sin(2 * np.pi * 0.1 * t)) / sampling_rate
+    systolic = np.maximum(np.sin(beat_phase), 0) ** 3
+    dicrotic = 0.3 * np.maximum(np.sin(beat_phase - 2), 0) ** 4
+    return 80 + 40 * (systolic + dicrotic) + 2 * np.sin(2 * np.pi * 0.2 * t) + rng.normal(0, 0.5, len(t))
+
+
+def _time_call[T](function: Callable[[], T]) -> tuple[float, T]:
+    best_time = np.inf
+    for _ in range(_BENCHMARK_REPEATS):
+        start = time.perf_counter()
+        result = function()
+        best_time = min(best_time, time.perf_counter() - start)
+    return best_time, result
+
+
+if __name__ == '__main__':
+    benchmark_dv_kernels()
+    benchmark_approximate()
+    benchmark_peak_detection()
+    benchmark_streaming()
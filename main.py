@@ -1,10 +1,10 @@
 import matplotlib
-from src.common.constants import CB_FILE_TYPE
+from src.analysis import AnalysisPlan, cjte, run_plans, te
+from src.common.constants import CB_FILE_TYPE, ESTIMATE_CACHE_PATH, RESULTS_CHECKPOINT_DIRECTORY_PATH
 from src.common.logger import logger
+from src.data_process.entropy import EstimateCache
 from src.data_process.loaders import BaroreflexDataLoader
 from src.data_process.processors import BaroreflexDataProcessor
-from src.data_process.results_generators import BaroreflexResultsGenerator
-from src.statistics import StatisticsAnalyzer
 from src.synthetic import (
     BIVARIATE_SYNTHETIC_SIGNALS_DATA,
     TRIVARIATE_SYNTHETIC_SIGNALS_DATA,
@@ -13,64 +13,75 @@ from src.synthetic import (
 matplotlib.use('Agg')
 
 
-def analyse_physiological_data() -> None:
-    logger.info('Running physiological data analysis')
+def analyse_physiological_data() -> list[AnalysisPlan]:
     PHYSIOLOGICAL_RESULTS_CSV_FILE_NAME = 'results_physiological.csv'
-    data_loader = BaroreflexDataLoader()
-    data_processor = BaroreflexDataProcessor()
+    data_loader = BaroreflexDataLoader(lazy=True)
 
-    raw_data = data_loader.load_all_raw_data()
-    processed_data = data_processor.process_all(raw_data)
+    te_sap_hp = te(y_name='sap', x_name='hp')
+    te_etco_hp = te(y_name='etco2', x_name='hp')
+    te_etco_sap = te(y_name='etco2', x_name='sap')
+    cjte_sap_hp = cjte('sap', 'etco2', 'hp', 'etco2')
+    return [
+        AnalysisPlan(
+            title='Physiological',
+            data=data_loader.load_all_raw_data(),
+            processor=BaroreflexDataProcessor(),
+            measures=[te_sap_hp, te_etco_hp, te_etco_sap, cjte_sap_hp],
+            results_file=PHYSIOLOGICAL_RESULTS_CSV_FILE_NAME,
+            order=CB_FILE_TYPE.order(),
+            tested=[te_sap_hp, cjte_sap_hp, te_etco_sap, te_etco_hp],
+            compared=[(te_sap_hp, cjte_sap_hp)],
+            prefix_test_titles=False,
+        )
+    ]
 
-    rg = BaroreflexResultsGenerator(processed_data)
-    te_sap_hp = rg.add_te(y_name='sap', x_name='hp')
-    te_etco_hp = rg.add_te(y_name='etco2', x_name='hp')
-    te_etco_sap = rg.add_te(y_name='etco2', x_name='sap')
-    cjte_sap_hp = rg.add_cjte('sap', 'etco2', 'hp', 'etco2')
 
-    rg.generate_results_csv(PHYSIOLOGICAL_RESULTS_CSV_FILE_NAME)
-    analyzer = StatisticsAnalyzer(PHYSIOLOGICAL_RESULTS_CSV_FILE_NAME, order=CB_FILE_TYPE.order())
-    [analyzer.do_rm_anova_test(field, title=f'{field}') for field in [te_sap_hp, cjte_sap_hp, te_etco_sap, te_etco_hp]]
-    analyzer.compare(te_sap_hp, cjte_sap_hp)
-
-
-def analyse_synthetic_bivaraite() -> None:
-    logger.info('Running synthetic bivariate data analysis')
+def analyse_synthetic_bivaraite() -> list[AnalysisPlan]:
+    plans = []
     for title, data in BIVARIATE_SYNTHETIC_SIGNALS_DATA.items():
-        logger.info(f'Analysing {title}')
-        rg = BaroreflexResultsGenerator(data)
         order = None
         if 'Length' in title:
             order = ['Length=100', 'Length=200', 'Length=500', 'Length=1000']
-        yx = rg.add_te('x', 'y')
-        xy = rg.add_te('y', 'x')
-        rg.generate_results_csv(f'{title}.csv')
-        analyzer = StatisticsAnalyzer(f'{title}.csv', order=order)
-        [analyzer.do_rm_anova_test(field, title=f'{title} {field}') for field in [yx, xy]]
+        plans.append(
+            AnalysisPlan(
+                title=title,
+                data=data,
+                measures=[te('x', 'y'), te('y', 'x')],
+                results_file=f'{title}.csv',
+                order=order,
+            )
+        )
+    return plans
 
 
-def analyse_synthetic_trivaraite() -> None:
-    logger.info('Running synthetic trivariate data analysis')
+def analyse_synthetic_trivaraite() -> list[AnalysisPlan]:
+    plans = []
     for title, data in TRIVARIATE_SYNTHETIC_SIGNALS_DATA.items():
-        logger.info(f'Analysing {title}')
-        rg = BaroreflexResultsGenerator(data)
-        te_yx = rg.add_te('x', 'y')
-        te_xy = rg.add_te('y', 'x')
-        te_zx = rg.add_te('x', 'z')
-        te_zy = rg.add_te('y', 'z')
-        cjte_xyz = rg.add_cjte('x', 'z', 'y', 'z')
-        cjte_yxz = rg.add_cjte('y', 'z', 'x', 'z')
-        rg.generate_results_csv(f'{title}.csv')
-        analyzer = StatisticsAnalyzer(f'{title}.csv')
-        [
-            analyzer.do_rm_anova_test(field, title=f'{title} {field}')
-            for field in [te_yx, te_xy, cjte_xyz, cjte_yxz, te_zx, te_zy]
-        ]
-        analyzer.compare(te_xy, cjte_xyz)
+        te_yx = te('x', 'y')
+        te_xy = te('y', 'x')
+        te_zx = te('x', 'z')
+        te_zy = te('y', 'z')
+        cjte_xyz = cjte('x', 'z', 'y', 'z')
+        cjte_yxz = cjte('y', 'z', 'x', 'z')
+        plans.append(
+            AnalysisPlan(
+                title=title,
+                data=data,
+                measures=[te_yx, te_xy, te_zx, te_zy, cjte_xyz, cjte_yxz],
+                results_file=f'{title}.csv',
+                tested=[te_yx, te_xy, cjte_xyz, cjte_yxz, te_zx, te_zy],
+                compared=[(te_xy, cjte_xyz)],
+            )
+        )
+    return plans
 
 
 if __name__ == '__main__':
-    analyse_physiological_data()
-    analyse_synthetic_bivaraite()
-    analyse_synthetic_trivaraite()
+    logger.info('Running physiological and synthetic data analysis')
+    run_plans(
+        [*analyse_physiological_data(), *analyse_synthetic_bivaraite(), *analyse_synthetic_trivaraite()],
+        n_workers=None,
+        estimate_cache=EstimateCache(ESTIMATE_CACHE_PATH),
+        checkpoint_directory=RESULTS_CHECKPOINT_DIRECTORY_PATH,
+    )
     logger.info('Finished')
@@ -0,0 +1,2 @@
+from .plan import AnalysisPlan, Measure, add_plans, cjte, expand_grid, jte, run_plans, te
+from .scheduler import Task, TaskGraph
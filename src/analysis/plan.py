@@ -0,0 +1,589 @@
+import itertools
+import json
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Literal, cast
+
+import pandas as pd
+
+from src.analysis.scheduler import TaskGraph, TaskKey
+from src.common.constants import DEFAULT_EMBEDDING_DIMENSION, DEFAULT_SIGNIFICANCE_LEVEL, DEFAULT_TIME_DELAY
+from src.common.logger import logger
+from src.common.mytypes import ArrayDataDict, SubjectData
+from src.data_process.entropy import (
+    EstimateCache,
+    cjte_dv,
+    cmi_from_partition,
+    embed_signal,
+    get_estimate_key,
+    jte_dv,
+    partition_joint_space,
+    plan_cmi_query,
+    te_dv,
+)
+from src.data_process.entropy.conditional_mutual_information import CMIQuery, ColumnBlocks, PartitionBounds
+from src.data_process.loaders.data_loader import CBFileError
+from src.data_process.processors.data_processor import DataProcessor
+from src.data_process.processors.stage_cache import get_fingerprint
+from src.data_process.results_generators.checkpoint import ResultCheckpoint
+from src.data_process.results_generators.result_table import ResultTable
+from src.statistics import StatisticsAnalyzer
+
+type EstimatorName = Literal['te', 'jte', 'cjte']
+
+# estimate (None if it failed) and whether it came from the estimate cache (None without a cache)
+type Estimate = tuple[float | None, bool | None]
+
+# subject (as the object in the dataset), its id, condition and parameters of its processing (None if not processed)
+type ConditionKey = tuple[int, int, str, str | None]
+
+# subject id, condition and field name of a result
+type _Row = tuple[int, str, str]
+
+_ESTIMATORS: dict[EstimatorName, Callable[..., float]] = {'te': te_dv, 'jte': jte_dv, 'cjte': cjte_dv}
+
+
+@dataclass(frozen=True)
+class Measure:
+    """
+    Estimate of one subject condition: 'te' of signals (x, y) is TE_{y->x}, 'jte' of signals (x, y, z)
+    is JTE_{(x,y)->z}, 'cjte' of signals (x, y, z, w) is CJTE_{(x,y)->z|w} (CJTE_{(x,y)->z|y} if w is y).
+    """
+
+    estimator: EstimatorName
+    signals: tuple[str, ...]
+    time_delay: int = DEFAULT_TIME_DELAY
+    embedding_dimension: int = DEFAULT_EMBEDDING_DIMENSION
+    dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL
+
+    @property
+    def field_name(self) -> str:
+        """
+        Name of the results field, as named by BaroreflexResultsGenerator for default parameters.
+        """
+        if self.estimator == 'te':
+            x_name, y_name = self.signals
+            name = f'te_{y_name}->{x_name}'
+        elif self.estimator == 'jte':
+            x_name, y_name, z_name = self.signals
+            name = f'jte_({x_name},{y_name})->{z_name}'
+        else:
+            x_name, y_name, z_name, w_name = self.signals
+            name = f'cjte_({x_name},{y_name})->{z_name}|{w_name}'
+        if self.time_delay != DEFAULT_TIME_DELAY or self.embedding_dimension != DEFAULT_EMBEDDING_DIMENSION:
+            name += f'_tau={self.time_delay}_d={self.embedding_dimension}'
+        if self.dvp_alpha != DEFAULT_SIGNIFICANCE_LEVEL:
+            name += f'_alpha={self.dvp_alpha}'
+        return name
+
+
+def te(x_name: str, y_name: str) -> Measure:
+    return Measure('te', (x_name, y_name))
+
+
+def jte(x_name: str, y_name: str, z_name: str) -> Measure:
+    return Measure('jte', (x_name, y_name, z_name))
+
+
+def cjte(x_name: str, y_name: str, z_name: str, w_name: str) -> Measure:
+    return Measure('cjte', (x_name, y_name, z_name, w_name))
+
+
+def expand_grid(
+    measures: Sequence[Measure],
+    time_delays: Sequence[int] = (DEFAULT_TIME_DELAY,),
+    embedding_dimensions: Sequence[int] = (DEFAULT_EMBEDDING_DIMENSION,),
+    dvp_alphas: Sequence[float] = (DEFAULT_SIGNIFICANCE_LEVEL,),
+) -> list[Measure]:
+    """
+    Every measure with every combination of the parameters.
+    """
+    return [
+        Measure(measure.estimator, measure.signals, time_delay, embedding_dimension, dvp_alpha)
+        for measure, time_delay, embedding_dimension, dvp_alpha in itertools.product(
+            measures, time_delays, embedding_dimensions, dvp_alphas
+        )
+    ]
+
+
+@dataclass
+class AnalysisPlan:
+    """
+    Declarative analysis of a dataset: measures estimated for every subject condition, saved to `results_file`,
+    followed by repeated measures ANOVA of `tested` measures and paired comparisons of `compared` measures.
+
+    Conditions are processed by `processor` first if given (e.g. raw physiological recordings), otherwise
+    the dataset already holds the signals of the measures (e.g. synthetic data).
+    Work is shared between plans of the same dataset subjects (the same objects) and processing.
+    Tests are titled '<title> <field>', or '<field>' without prefix_test_titles.
+    """
+
+    title: str
+    data: Sequence[SubjectData]
+    measures: list[Measure]
+    results_file: str
+    processor: DataProcessor | None = None
+    order: list[str] | None = None
+    tested: list[Measure] | None = None
+    compared: list[tuple[Measure, Measure]] = field(default_factory=list)
+    prefix_test_titles: bool = True
+
+
+@dataclass(frozen=True)
+class _Query:
+    """
+    Conditional mutual information of a measure over blocks (name, signal, 'future' or 'past' vectors)
+    laid out in the order of its joint space.
+    """
+
+    blocks: tuple[tuple[str, str, str], ...]
+    target: tuple[str, ...]
+    sources: tuple[str, ...]
+    conditioning: tuple[str, ...]
+
+    @property
+    def layout(self) -> tuple[tuple[str, str], ...]:
+        """
+        Vectors of the joint space, the same for measures that can share its partitioning.
+        """
+        return tuple((signal_name, kind) for _, signal_name, kind in self.blocks)
+
+    @property
+    def signal_names(self) -> tuple[str, ...]:
+        return tuple(dict.fromkeys(signal_name for _, signal_name, _ in self.blocks))
+
+    def plan(self, embeddings: dict[str, ColumnBlocks]) -> CMIQuery:
+        blocks = {name: embeddings[signal_name][kind] for name, signal_name, kind in self.blocks}
+        return plan_cmi_query(blocks, self.target, self.sources, self.conditioning)
+
+
+@dataclass
+class _Condition:
+    subject_data: SubjectData
+    condition: str
+    processor: DataProcessor | None
+    # pending measures of all plans in order, as a dict for uniqueness
+    measures: dict[Measure, None] = field(default_factory=dict)
+
+
+@dataclass
+class _ExpandedPlan:
+    """
+    Rows of the results of a plan, those restored from its checkpoint and its pending estimates.
+    """
+
+    rows: list[_Row]
+    restored: dict[_Row, float | None]
+    pending: list[tuple[ConditionKey, Measure]]
+
+
+@dataclass(frozen=True)
+class _Partitioning:
+    """
+    Partitioning of a joint space shared by estimates, or the error of partitioning it.
+    """
+
+    bounds: PartitionBounds | None
+    error: str | None = None
+
+
+def _get_query(measure: Measure) -> _Query:
+    """
+    Blocks as laid out by te_dv, jte_dv and cjte_dv, so estimates on shared partitionings are equal to theirs.
+    """
+    if measure.estimator == 'te':
+        x_name, y_name = measure.signals
+        te_blocks = (('futureX', x_name, 'future'), ('pastX', x_name, 'past'), ('pastY', y_name, 'past'))
+        return _Query(te_blocks, ('futureX',), ('pastY',), ('pastX',))
+
+    x_name, y_name, z_name = measure.signals[:3]
+    blocks = (
+        ('futureZ', z_name, 'future'),
+        ('pastZ', z_name, 'past'),
+        ('pastX', x_name, 'past'),
+        ('pastY', y_name, 'past'),
+    )
+    if measure.estimator == 'jte':
+        return _Query(blocks, ('futureZ',), ('pastX', 'pastY'), ('pastZ',))
+    w_name = measure.signals[3]
+    if w_name == y_name:
+        return _Query(blocks, ('futureZ',), ('pastX',), ('pastZ', 'pastY'))
+    return _Query((*blocks, ('pastW', w_name, 'past')), ('futureZ',), ('pastX', 'pastY'), ('pastZ', 'pastW'))
+
+
+def add_plans(
+    graph: TaskGraph,
+    plans: Sequence[AnalysisPlan],
+    estimate_cache: EstimateCache | None = None,
+    checkpoints: Mapping[str, ResultCheckpoint] | None = None,
+) -> dict[str, TaskKey]:
+    """
+    Expands the plans into tasks: load (and process) every subject condition, embed its signals, partition
+    the joint spaces of the measures, estimate every measure, collect the results and test them.
+    Returns the key of the task collecting the results DataFrame of every plan by title.
+
+    Tasks are keyed by what they compute: the subject of the dataset, the condition, its processing
+    and the measure or embedding parameters, so work of several plans (or measures) is shared, e.g.
+    an embedding by all measures of the signal and a partitioning by JTE_{(X,Y)->Z} and CJTE_{(X,Y)->Z|Y}.
+    Partitionings are skipped if all estimates sharing them are in `estimate_cache`.
+
+    Estimates are recorded in the checkpoint of the results file in `checkpoints` as they complete, with
+    a fingerprint of the (processed) signals of their condition. Results found in it are restored instead
+    of estimated if the signals are unchanged, which loads their conditions to compare the fingerprints,
+    and results of changed signals are estimated again.
+    """
+    checkpoints = checkpoints or {}
+    conditions: dict[ConditionKey, _Condition] = {}
+    fingerprints: dict[ConditionKey, str | None] = {}
+    expanded = [_expand_plan(plan, checkpoints.get(plan.results_file), conditions, fingerprints) for plan in plans]
+    for condition_key, condition in conditions.items():
+        _add_condition(graph, condition_key, condition, estimate_cache)
+    return {
+        plan.title: _add_results(graph, plan, expanded_plan, checkpoints.get(plan.results_file))
+        for plan, expanded_plan in zip(plans, expanded, strict=True)
+    }
+
+
+def run_plans(
+    plans: Sequence[AnalysisPlan],
+    n_workers: int | None = None,
+    estimate_cache: EstimateCache | None = None,
+    checkpoint_directory: Path | None = None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Runs all plans as one task graph and returns the results DataFrame of every plan by title.
+
+    checkpoint_directory: directory of a checkpoint per results file, so an interrupted run resumes where
+    it stopped, for conditions with unchanged signals (see `add_plans`). A checkpoint is removed once its
+    results file is saved, so complete runs start over (and take unchanged estimates from `estimate_cache`).
+    """
+    checkpoints: dict[str, ResultCheckpoint] = {}
+    if checkpoint_directory is not None:
+        for plan in plans:
+            if plan.results_file not in checkpoints:
+                checkpoint_path = checkpoint_directory / f'{Path(plan.results_file).stem}.jsonl'
+                checkpoints[plan.results_file] = ResultCheckpoint(checkpoint_path)
+
+    graph = TaskGraph()
+    results = add_plans(graph, plans, estimate_cache, checkpoints)
+    try:
+        outputs = graph.run(outputs=results.values(), n_workers=n_workers)
+    finally:
+        for checkpoint in checkpoints.values():
+            checkpoint.flush()
+    if estimate_cache is not None:
+        estimate_cache.log_statistics()
+    return {title: outputs[key] for title, key in results.items()}
+
+
+def _expand_plan(
+    plan: AnalysisPlan,
+    checkpoint: ResultCheckpoint | None,
+    conditions: dict[ConditionKey, _Condition],
+    fingerprints: dict[ConditionKey, str | None],
+) -> _ExpandedPlan:
+    """
+    Pending estimates are added to the measures of their conditions.
+    """
+    restored = _restore_results(plan, checkpoint, fingerprints) if checkpoint is not None else {}
+    rows: list[_Row] = []
+    pending: list[tuple[ConditionKey, Measure]] = []
+    for condition_key, subject_data in _iterate_conditions(plan):
+        _, subject_id, condition, _ = condition_key
+        for measure in plan.measures:
+            row = (subject_id, condition, measure.field_name)
+            rows.append(row)
+            if row in restored:
+                continue
+            pending.append((condition_key, measure))
+            if condition_key not in conditions:
+                conditions[condition_key] = _Condition(subject_data, condition, plan.processor)
+            conditions[condition_key].measures.setdefault(measure)
+    return _ExpandedPlan(rows, restored, pending)
+
+
+def _restore_results(
+    plan: AnalysisPlan, checkpoint: ResultCheckpoint, fingerprints: dict[ConditionKey, str | None]
+) -> dict[_Row, float | None]:
+    """
+    Results of the checkpoint estimated from the current signals of their conditions.
+    """
+    records = {
+        (subject_id, condition, field_name): (value, fingerprint)
+        for condition, subject_id, field_name, value, fingerprint in checkpoint.load()
+    }
+    restored: dict[_Row, float | None] = {}
+    n_discarded = 0
+    for condition_key, subject_data in _iterate_conditions(plan):
+        _, subject_id, condition, _ = condition_key
+        condition_records = {
+            row: records[row]
+            for measure in plan.measures
+            if (row := (subject_id, condition, measure.field_name)) in records
+        }
+        if not condition_records:
+            continue
+        if condition_key not in fingerprints:
+            fingerprints[condition_key] = _fingerprint(_load_condition(subject_data, condition, plan.processor))
+        for row, (value, fingerprint) in condition_records.items():
+            if fingerprint == fingerprints[condition_key]:
+                restored[row] = value
+            else:
+                n_discarded += 1
+
+    if restored:
+        logger.info(f'Restored {len(restored)} results of {plan.title} from {checkpoint.path}')
+    if n_discarded:
+        logger.warning(f'Discarded {n_discarded} results of {plan.title} in {checkpoint.path} of changed signals')
+    return restored
+
+
+def _iterate_conditions(plan: AnalysisPlan) -> Iterator[tuple[ConditionKey, SubjectData]]:
+    processing = json.dumps(plan.processor.get_parameters(), sort_keys=True) if plan.processor else None
+    for subject_data in plan.data:
+        subject_id = cast(int, subject_data['id'])
+        for condition in subject_data:
+            if condition != 'id':
+                yield (id(subject_data), subject_id, condition, processing), subject_data
+
+
+def _add_condition(
+    graph: TaskGraph, condition_key: ConditionKey, condition: _Condition, estimate_cache: EstimateCache | None
+) -> None:
+    signals = graph.add(
+        ('load', *condition_key),
+        _load_condition,
+        arguments=(condition.subject_data, condition.condition, condition.processor),
+        local=condition.processor is None,
+    )
+
+    queries = {measure: _get_query(measure) for measure in condition.measures}
+    partitions: dict[tuple[Any, ...], list[Measure]] = {}
+    for measure, query in queries.items():
+        parameters = (query.layout, measure.time_delay, measure.embedding_dimension, measure.dvp_alpha)
+        partitions.setdefault(parameters, []).append(measure)
+
+    for (layout, time_delay, embedding_dimension, dvp_alpha), measures in partitions.items():
+        # measures of a partitioning share the layout of the joint space, and thus the embeddings
+        query = queries[measures[0]]
+        embeddings = [
+            graph.add(
+                ('embed', *condition_key, signal_name, time_delay, embedding_dimension),
+                _embed,
+                dependencies=[signals],
+                arguments=(signal_name, time_delay, embedding_dimension),
+                local=True,
+            )
+            for signal_name in query.signal_names
+        ]
+        partitioning = graph.add(
+            ('partition', *condition_key, layout, time_delay, embedding_dimension, dvp_alpha),
+            _partition,
+            dependencies=[signals, *embeddings],
+            arguments=(query, dvp_alpha, measures, estimate_cache),
+        )
+        for measure in measures:
+            estimate = graph.add(
+                ('estimate', *condition_key, measure),
+                _estimate,
+                dependencies=[signals, partitioning, *embeddings],
+                arguments=(measure, estimate_cache, condition_key),
+            )
+            if estimate_cache is not None:
+                # requests are counted in this process, estimates run on copies of the cache in workers
+                graph.add(
+                    ('count', *condition_key, measure),
+                    _count_cache_request,
+                    dependencies=[estimate],
+                    arguments=(estimate_cache,),
+                    local=True,
+                )
+
+
+def _add_results(
+    graph: TaskGraph,
+    plan: AnalysisPlan,
+    expanded_plan: _ExpandedPlan,
+    checkpoint: ResultCheckpoint | None,
+) -> TaskKey:
+    estimates: list[TaskKey] = []
+    for condition_key, measure in expanded_plan.pending:
+        estimate: TaskKey = ('estimate', *condition_key, measure)
+        if checkpoint is not None:
+            _, subject_id, condition, _ = condition_key
+            fingerprint = graph.add(
+                ('fingerprint', *condition_key), _fingerprint, [('load', *condition_key)], local=True
+            )
+            estimate = graph.add(
+                ('checkpoint', plan.results_file, *condition_key, measure),
+                _checkpoint_estimate,
+                dependencies=[estimate, fingerprint],
+                arguments=(checkpoint, (subject_id, condition, measure.field_name)),
+                local=True,
+            )
+        estimates.append(estimate)
+    results = graph.add(
+        ('results', plan.title, plan.results_file),
+        _collect_results,
+        dependencies=estimates,
+        arguments=(expanded_plan.rows, expanded_plan.restored, plan.results_file, checkpoint),
+        local=True,
+    )
+    graph.add(('statistics', plan.title, plan.results_file), _test_results, [results], [plan], local=True)
+    return results
+
+
+def _load_condition(subject_data: SubjectData, condition: str, processor: DataProcessor | None) -> ArrayDataDict | None:
+    try:
+        if processor is not None:
+            return processor.process_condition(subject_data, condition)
+        return cast(ArrayDataDict, subject_data[condition])
+    except ValueError:
+        logger.error(f'Missmatching field names for subject: {subject_data["id"]}')
+    except CBFileError as e:
+        logger.warning(f'Failed to load all columns for subject: {subject_data["id"]}\n {e}')
+    except Exception as e:  # noqa: BLE001
+        # e.g. peak detection failing on a flat signal, only this condition of the subject is skipped
+        logger.error(f'Unexpected exception for subject: {subject_data["id"]} {condition}\n {e!r}')
+    return None
+
+
+def _embed(
+    signal_name: str, time_delay: int, embedding_dimension: int, signals: ArrayDataDict | None
+) -> ColumnBlocks | None:
+    if signals is None or (signal := signals.get(signal_name)) is None:
+        return None
+    try:
+        return embed_signal(signal, time_delay, embedding_dimension)
+    except ValueError:
+        # estimates without the embedding fall back to their estimator, which reports the error
+        return None
+
+
+def _partition(
+    query: _Query,
+    dvp_alpha: float,
+    measures: list[Measure],
+    estimate_cache: EstimateCache | None,
+    signals: ArrayDataDict | None,
+    *embeddings: ColumnBlocks | None,
+) -> _Partitioning | None:
+    if signals is None or any(embedding is None for embedding in embeddings):
+        return None
+    if estimate_cache is not None and all(
+        estimate_cache.get(_get_estimate_key(measure, signals)) is not None for measure in measures
+    ):
+        return None
+    try:
+        cmi_query = query.plan(dict(zip(query.signal_names, cast(list[ColumnBlocks], embeddings), strict=True)))
+        return _Partitioning(partition_joint_space(cmi_query.joint, dvp_alpha))
+    except ValueError as e:
+        return _Partitioning(None, str(e))
+
+
+def _estimate(
+    measure: Measure,
+    estimate_cache: EstimateCache | None,
+    condition_key: ConditionKey,
+    signals: ArrayDataDict | None,
+    partitioning: _Partitioning | None,
+    *embeddings: ColumnBlocks | None,
+) -> Estimate:
+    _, subject_id, condition, _ = condition_key
+    if signals is None:
+        return None, None
+    if missing := [name for name in measure.signals if name not in signals]:
+        logger.error(f'Fields {missing} do not exist in {condition} for subject {subject_id}!')
+        return None, None
+
+    def compute() -> float:
+        if partitioning is None or any(embedding is None for embedding in embeddings):
+            # e.g. the partitioning was skipped for a cached estimate evicted since
+            return _ESTIMATORS[measure.estimator](*_get_estimator_arguments(measure, signals))
+        if partitioning.bounds is None:
+            raise ValueError(partitioning.error)
+        query = _get_query(measure)
+        cmi_query = query.plan(dict(zip(query.signal_names, cast(list[ColumnBlocks], embeddings), strict=True)))
+        return cmi_from_partition(cmi_query, partitioning.bounds)
+
+    try:
+        if estimate_cache is None:
+            return compute(), None
+        cached = estimate_cache.get_or_compute(_get_estimate_key(measure, signals), compute)
+        if cached.error is not None:
+            logger.error(f'{measure.estimator.upper()} calculation error for P{subject_id} {condition} {cached.error}')
+        return cached.value, cached.is_hit
+    except ValueError as e:
+        logger.error(f'{measure.estimator.upper()} calculation error for P{subject_id} {condition} {e}')
+    except Exception as e:  # noqa: BLE001
+        logger.error(f'Unexpected {measure.estimator.upper()} exception for P{subject_id} {condition}\n {e!r}')
+    return None, None
+
+
+def _get_estimator_arguments(measure: Measure, signals: ArrayDataDict) -> tuple[Any, ...]:
+    arrays: list[Any] = [signals[name] for name in measure.signals]
+    if measure.estimator == 'cjte' and measure.signals[3] == measure.signals[1]:
+        arrays[3] = None
+    return *arrays, measure.time_delay, measure.embedding_dimension, measure.dvp_alpha
+
+
+def _get_estimate_key(measure: Measure, signals: ArrayDataDict) -> str:
+    # the key of the estimator, so estimates computed on shared partitionings and by the estimator are the same entries
+    return get_estimate_key(_ESTIMATORS[measure.estimator], *_get_estimator_arguments(measure, signals))
+
+
+def _count_cache_request(estimate_cache: EstimateCache, estimate: Estimate | None) -> None:
+    if estimate is not None and (is_hit := estimate[1]) is not None:
+        estimate_cache.count(is_hit)
+
+
+def _fingerprint(signals: ArrayDataDict | None) -> str | None:
+    return get_fingerprint(signals, {}) if signals is not None else None
+
+
+def _checkpoint_estimate(
+    checkpoint: ResultCheckpoint, row: _Row, estimate: Estimate | None, fingerprint: str | None
+) -> Estimate | None:
+    # failed estimates are recorded as done too, unlike tasks that failed in the scheduler
+    if estimate is not None:
+        subject_id, condition, field_name = row
+        checkpoint.append(condition, subject_id, field_name, estimate[0], fingerprint)
+    return estimate
+
+
+def _collect_results(
+    rows: list[tuple[int, str, str]],
+    restored: dict[tuple[int, str, str], float | None],
+    results_file: str,
+    checkpoint: ResultCheckpoint | None,
+    *estimates: Estimate | None,
+) -> pd.DataFrame:
+    table = ResultTable()
+    computed = iter(estimates)
+    for row in rows:
+        if row in restored:
+            value = restored[row]
+        else:
+            estimate = next(computed)
+            value = estimate[0] if estimate is not None else None
+        subject_id, condition, field_name = row
+        table.set(condition, subject_id, field_name, value)
+    table.export(results_file)
+    logger.info(f'Sucesfully saved results to {results_file}')
+    if checkpoint is not None:
+        checkpoint.discard()
+    return table.to_dataframe()
+
+
+def _test_results(plan: AnalysisPlan, results: pd.DataFrame) -> None:
+    tested = plan.tested if plan.tested is not None else plan.measures
+    if not tested and not plan.compared:
+        return
+    logger.info(f'Testing {plan.title}')
+    analyzer = StatisticsAnalyzer(results, order=plan.order)
+    for measure in tested:
+        title = f'{plan.title} {measure.field_name}' if plan.prefix_test_titles else measure.field_name
+        analyzer.do_rm_anova_test(measure.field_name, title=title)
+    for first, second in plan.compared:
+        analyzer.compare(first.field_name, second.field_name)
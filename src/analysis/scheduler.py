@@ -0,0 +1,135 @@
+import os
+from collections import deque
+from collections.abc import Callable, Hashable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+
+from src.common.logger import logger
+
+_TASKS_IN_FLIGHT_PER_WORKER = 2
+
+type TaskKey = Hashable
+
+
+@dataclass(frozen=True)
+class Task:
+    """
+    Node of a TaskGraph: function(*arguments, *results of dependencies).
+    Local tasks run in the scheduling process, e.g. because they write files or plots.
+    """
+
+    function: Callable[..., Any]
+    dependencies: tuple[TaskKey, ...] = ()
+    arguments: tuple[Any, ...] = ()
+    local: bool = False
+
+
+class TaskGraph:
+    """
+    Directed acyclic graph of tasks identified by keys. A task added under an existing key is the same task,
+    so identical work requested several times (e.g. by several analyses) is done once.
+
+    Tasks run on a process pool as soon as their dependencies are done. At most a few tasks per worker
+    are in flight, tasks unlocked by finished work run before new independent tasks (depth first),
+    and results are released once all their dependents have started, so memory stays bounded
+    by the tasks in flight rather than the size of the graph.
+
+    A task raising an exception is logged and its result is None, so its dependents still run and skip it
+    (as plan tasks skip the failed subject condition), and the rest of the graph is not affected.
+    """
+
+    def __init__(self) -> None:
+        self.tasks: dict[TaskKey, Task] = {}
+        self.n_deduplicated = 0
+
+    def add(
+        self,
+        key: TaskKey,
+        function: Callable[..., Any],
+        dependencies: Iterable[TaskKey] = (),
+        arguments: Iterable[Any] = (),
+        local: bool = False,
+    ) -> TaskKey:
+        if key in self.tasks:
+            self.n_deduplicated += 1
+            return key
+        dependencies = tuple(dependencies)
+        if missing := [dependency for dependency in dependencies if dependency not in self.tasks]:
+            raise ValueError(f'Task {key} depends on unknown tasks: {missing}')
+        self.tasks[key] = Task(function, dependencies, tuple(arguments), local)
+        return key
+
+    def run(self, outputs: Iterable[TaskKey] = (), n_workers: int | None = 1) -> dict[TaskKey, Any]:
+        """
+        Runs all tasks and returns the results of `outputs`. n_workers: number of processes,
+        None for the number of CPUs, 1 runs all tasks serially in the current process.
+        """
+        outputs = set(outputs)
+        logger.info(f'Running {len(self.tasks)} tasks ({self.n_deduplicated} duplicates skipped)')
+        if n_workers == 1:
+            return _GraphRun(self.tasks, outputs, executor=None, max_in_flight=1).run()
+        n_workers = n_workers or os.process_cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            return _GraphRun(self.tasks, outputs, executor, _TASKS_IN_FLIGHT_PER_WORKER * n_workers).run()
+
+
+class _GraphRun:
+    def __init__(
+        self, tasks: dict[TaskKey, Task], outputs: set[TaskKey], executor: Executor | None, max_in_flight: int
+    ) -> None:
+        self.tasks = tasks
+        self.outputs = outputs
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self.results: dict[TaskKey, Any] = {}
+        self.dependents: dict[TaskKey, list[TaskKey]] = {key: [] for key in tasks}
+        for key, task in tasks.items():
+            for dependency in task.dependencies:
+                self.dependents[dependency].append(key)
+        self.n_waiting = {key: len(task.dependencies) for key, task in tasks.items()}
+        self.n_unstarted_dependents = {key: len(dependents) for key, dependents in self.dependents.items()}
+        self.ready = deque(key for key, n_waiting in self.n_waiting.items() if n_waiting == 0)
+
+    def run(self) -> dict[TaskKey, Any]:
+        pending: dict[Future[Any], TaskKey] = {}
+        while self.ready or pending:
+            while self.ready and len(pending) < self.max_in_flight:
+                key = self.ready.popleft()
+                task = self.tasks[key]
+                arguments = (*task.arguments, *(self.results[dependency] for dependency in task.dependencies))
+                self._start(task)
+                if task.local or self.executor is None:
+                    self._complete(key, _call_isolated(key, task.function, *arguments))
+                else:
+                    pending[self.executor.submit(task.function, *arguments)] = key
+            if not pending:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                self._complete(key, _call_isolated(key, future.result))
+        return {key: self.results[key] for key in self.outputs}
+
+    def _start(self, task: Task) -> None:
+        for dependency in task.dependencies:
+            self.n_unstarted_dependents[dependency] -= 1
+            if self.n_unstarted_dependents[dependency] == 0 and dependency not in self.outputs:
+                del self.results[dependency]
+
+    def _complete(self, key: TaskKey, result: Any) -> None:
+        if self.dependents[key] or key in self.outputs:
+            self.results[key] = result
+        # dependents unlocked by this task run next, before further independent tasks
+        for dependent in reversed(self.dependents[key]):
+            self.n_waiting[dependent] -= 1
+            if self.n_waiting[dependent] == 0:
+                self.ready.appendleft(dependent)
+
+
+def _call_isolated(key: TaskKey, function: Callable[..., Any], *arguments: Any) -> Any:
+    try:
+        return function(*arguments)
+    except Exception as e:  # noqa: BLE001
+        logger.error(f'Task {key} failed\n {e!r}')
+        return None
@@ -3,6 +3,11 @@ from pathlib import Path
 
 METADATA_PATH = Path('data/metadata.xlsx')
 BREATHING_DATA_DIRECTORY_PATH = Path('data/CONTROL_BREATHING_RECORDINGS')
+RAW_DATA_CACHE_DIRECTORY_PATH = Path('data/.cache/raw')
+PROCESSED_DATA_CACHE_DIRECTORY_PATH = Path('data/.cache/processed')
+SYNTHETIC_DATA_CACHE_DIRECTORY_PATH = Path('data/.cache/synthetic')
+ESTIMATE_CACHE_PATH = Path('data/.cache/estimates.sqlite')
+RESULTS_CHECKPOINT_DIRECTORY_PATH = Path('results/checkpoints')
 
 ID_FIELD = 'pid'
 CONDITION_FIELD = 'cb_type'
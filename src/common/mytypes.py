@@ -1,3 +1,4 @@
+from collections.abc import Callable, Iterator, Mapping
 from dataclasses import dataclass
 
 import numpy as np
@@ -14,4 +15,43 @@ class FFT_Result:
 
 type FloatArray = NDArray[np.floating]
 type ArrayDataDict = dict[str, FloatArray]
-type SubjectData = dict[str, int | ArrayDataDict]
+type SubjectData = Mapping[str, int | ArrayDataDict]
+type ConditionLoader = Callable[[], ArrayDataDict]
+
+
+class LazySubjectData(Mapping[str, int | ArrayDataDict]):
+    """
+    Subject data that behaves like the eagerly loaded mapping {'id': ..., <condition>: ArrayDataDict},
+    but loads each condition on first access and keeps it until released.
+    """
+
+    def __init__(self, subject_id: int, condition_loaders: dict[str, ConditionLoader]) -> None:
+        self.subject_id = subject_id
+        self._condition_loaders = condition_loaders
+        self._loaded: dict[str, ArrayDataDict] = {}
+
+    def __getitem__(self, key: str) -> int | ArrayDataDict:
+        if key == 'id':
+            return self.subject_id
+        if key not in self._loaded:
+            self._loaded[key] = self._condition_loaders[key]()
+        return self._loaded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield 'id'
+        yield from self._condition_loaders
+
+    def __len__(self) -> int:
+        return len(self._condition_loaders) + 1
+
+    def is_loaded(self, condition: str) -> bool:
+        return condition in self._loaded
+
+    def release(self, condition: str | None = None) -> None:
+        """
+        Drops the arrays of the condition (all conditions if None); they are loaded again on next access.
+        """
+        if condition is None:
+            self._loaded.clear()
+        else:
+            self._loaded.pop(condition, None)
@@ -1,5 +1,18 @@
-from .conditional_joint_transfer_entropy import cjte_dv
-from .conditional_transfer_entropy import cte_dv
+from .approximate import ApproximateEstimate
+from .conditional_joint_transfer_entropy import cjte_dv, cjte_dv_approx
+from .conditional_mutual_information import (
+    cmi_dv,
+    cmi_dv_approx,
+    cmi_from_partition,
+    embed_signal,
+    partition_joint_space,
+    plan_cmi_query,
+)
+from .conditional_transfer_entropy import cte_dv, cte_dv_approx
 from .dvp import DVPartition, dv_partition_nd
-from .joint_transfer_entropy import jte_dv
-from .transfer_entropy_dv import te_dv
+from .estimate_cache import CachedEstimate, EstimateCache, get_estimate_key
+from .joint_transfer_entropy import jte_dv, jte_dv_approx
+from .multiscale import coarse_grain, te_multiscale
+from .network_inference import CandidateEvaluator, ConditioningSet, infer_network, select_conditioning_set
+from .partial_information_decomposition import PartialInformationDecomposition, pid_dv
+from .transfer_entropy_dv import te_dv, te_dv_approx
@@ -1,17 +1,51 @@
+from typing import Literal, overload
+
 import numpy as np
 from numpy.typing import NDArray
 
 from src.common.constants import DEFAULT_EMBEDDING_DIMENSION, DEFAULT_SIGNIFICANCE_LEVEL, DEFAULT_TIME_DELAY
-from src.common.logger import logger
-from src.data_process.entropy.dvp import dv_partition_nd
-from src.data_process.entropy.utils import (
-    MINIMAL_VALID_NUMBER_OF_DV_PARTITONS,
-    get_future_vector,
-    get_past_vectors,
-    get_points_from_range,
+from src.common.mytypes import FloatArray
+from src.data_process.entropy.approximate import (
+    DEFAULT_EXACT_MAX_POINTS,
+    DEFAULT_MAX_PARTITION_POINTS,
+    ApproximateEstimate,
+)
+from src.data_process.entropy.conditional_mutual_information import (
+    ColumnBlocks,
+    cmi_dv,
+    cmi_dv_approx,
+    get_embedded_blocks,
 )
 
 
+@overload
+def cjte_dv(
+    signalX: NDArray[np.floating],
+    signalY: NDArray[np.floating],
+    signalZ: NDArray[np.floating],
+    signalW: NDArray[np.floating] | None = None,
+    time_delay: int = ...,
+    embedding_dimension: int = ...,
+    dvp_alpha: float = ...,
+    *,
+    local: Literal[False] = False,
+) -> float: ...
+
+
+@overload
+def cjte_dv(
+    signalX: NDArray[np.floating],
+    signalY: NDArray[np.floating],
+    signalZ: NDArray[np.floating],
+    signalW: NDArray[np.floating] | None = None,
+    time_delay: int = ...,
+    embedding_dimension: int = ...,
+    dvp_alpha: float = ...,
+    *,
+    local: Literal[True],
+) -> FloatArray: ...
+
+
 def cjte_dv(
     signalX: NDArray[np.floating],
     signalY: NDArray[np.floating],
@@ -20,7 +54,9 @@ def cjte_dv(
     time_delay: int = DEFAULT_TIME_DELAY,
     embedding_dimension: int = DEFAULT_EMBEDDING_DIMENSION,
     dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
-) -> float:
+    *,
+    local: bool = False,
+) -> float | FloatArray:
     """
     Calculates the conditional joint transfer entropy
 
@@ -29,128 +65,68 @@ def cjte_dv(
 
     If W is None, then the following formula is assumed:
         CJTE_{(X,Y)->Z|Y}
+
+    If local is True, returns the local (pointwise) values for every sample of the future vector,
+    i.e. aligned with signal[embedding_dimension * time_delay:]. Their mean equals the average value.
     """
-    if signalW is None:
-        return _cjte_y_is_w(
-            signalX=signalX,
-            signalY=signalY,
-            signalZ=signalZ,
-            time_delay=time_delay,
-            embedding_dimension=embedding_dimension,
-            dvp_alpha=dvp_alpha,
-        )
-    return _cjte_w_is_different(
-        signalX=signalX,
-        signalY=signalY,
-        signalZ=signalZ,
-        signalW=signalW,
-        time_delay=time_delay,
-        embedding_dimension=embedding_dimension,
+    blocks, sources, conditioning = _get_cjte_blocks(
+        signalX, signalY, signalZ, signalW, time_delay, embedding_dimension
+    )
+    return cmi_dv(
+        blocks,
+        target=['futureZ'],
+        sources=sources,
+        conditioning=conditioning,
         dvp_alpha=dvp_alpha,
+        local=local,
     )
 
 
-def _cjte_y_is_w(
+def cjte_dv_approx(
     signalX: NDArray[np.floating],
     signalY: NDArray[np.floating],
     signalZ: NDArray[np.floating],
-    time_delay: int,
-    embedding_dimension: int,
-    dvp_alpha: float,
-) -> float:
+    signalW: NDArray[np.floating] | None = None,
+    time_delay: int = DEFAULT_TIME_DELAY,
+    embedding_dimension: int = DEFAULT_EMBEDDING_DIMENSION,
+    dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
+    max_partition_points: int = DEFAULT_MAX_PARTITION_POINTS,
+    exact_max_points: int = DEFAULT_EXACT_MAX_POINTS,
+) -> ApproximateEstimate:
     """
-    Calculates the conditional joint transfer entropy of CJTE_{(X,Y)->Z|Y}
+    Approximates the conditional joint transfer entropy of CJTE_{(X,Y)->Z|W} (or CJTE_{(X,Y)->Z|Y} if W is None)
+    for long signals, with a bound of its error. See `dv_estimate_approximate`.
     """
-    if not len(signalX) == len(signalY) == len(signalZ):
-        logger.error(
-            f"""Signals should have the same legth, instead have: \n
-            X:{len(signalX)}, Y:{len(signalY)}, Z:{len(signalZ)}"""
-        )
-        raise ValueError('time series entries need to have same length')
-
-    futureZ = get_future_vector(signalZ, d=embedding_dimension, tau=time_delay)
-    pastX, pastY, pastZ = (
-        get_past_vectors(signal, d=embedding_dimension, tau=time_delay) for signal in [signalX, signalY, signalZ]
+    blocks, sources, conditioning = _get_cjte_blocks(
+        signalX, signalY, signalZ, signalW, time_delay, embedding_dimension
+    )
+    return cmi_dv_approx(
+        blocks,
+        target=['futureZ'],
+        sources=sources,
+        conditioning=conditioning,
+        dvp_alpha=dvp_alpha,
+        max_partition_points=max_partition_points,
+        exact_max_points=exact_max_points,
     )
-
-    a = np.column_stack([futureZ, pastZ, pastX, pastY])
-    b = np.column_stack([pastZ, pastY])
-    c = np.column_stack([futureZ, pastZ, pastY])
-    d = np.column_stack([pastZ, pastX, pastY])
-
-    dv_result = dv_partition_nd(a, alpha=dvp_alpha)
-    if len(dv_result) < MINIMAL_VALID_NUMBER_OF_DV_PARTITONS:
-        raise ValueError(
-            f'Number of detected bins below minimum: {MINIMAL_VALID_NUMBER_OF_DV_PARTITONS} > {len(dv_result)}'
-        )
-    dimensions = a.shape[1]
-    n_total = a.shape[0]
-
-    futureZ_start, futureZ_end = 0, 1
-    pastZ_start, pastZ_end = futureZ_end, embedding_dimension + 1
-    pastY_start, pastY_end = 2 * embedding_dimension + 1, dimensions
-
-    cjte: float = 0
-    for dv_part in dv_result:
-        na = dv_part['N']
-        nb = get_points_from_range(b, dv_part, ranges=((pastZ_start, pastZ_end), (pastY_start, pastY_end)))
-        nc = get_points_from_range(c, dv_part, ranges=((futureZ_start, pastZ_end), (pastY_start, pastY_end)))
-        nd = get_points_from_range(d, dv_part, ranges=((pastZ_start, pastY_end),))
-
-        cjte += na / n_total * (np.log2(na * nb) - np.log2(nc * nd))
-
-    return cjte
 
 
-def _cjte_w_is_different(
+def _get_cjte_blocks(
     signalX: NDArray[np.floating],
     signalY: NDArray[np.floating],
     signalZ: NDArray[np.floating],
-    signalW: NDArray[np.floating],
+    signalW: NDArray[np.floating] | None,
     time_delay: int,
     embedding_dimension: int,
-    dvp_alpha: float,
-) -> float:
+) -> tuple[ColumnBlocks, list[str], list[str]]:
     """
-    Calculates the conditional joint transfer entropy of CJTE_{(X,Y)->Z|W}
-    """
-    if not len(signalX) == len(signalY) == len(signalZ) == len(signalW):
-        logger.error(
-            f"""Signals should have the same legth, instead have: \n
-            X:{len(signalX)}, Y:{len(signalY)}, Z:{len(signalZ)}, W:{len(signalW)}"""
-        )
-        raise ValueError('time series entries need to have same length')
-
-    futureZ = get_future_vector(signalZ, d=embedding_dimension, tau=time_delay)
-    pastX, pastY, pastZ, pastW = (
-        get_past_vectors(signal, d=embedding_dimension, tau=time_delay)
-        for signal in [signalX, signalY, signalZ, signalW]
-    )
+    Builds blocks [futureZ, pastZ, pastX, pastY(, pastW)] and names of the source and conditioning blocks.
 
-    a = np.column_stack([futureZ, pastZ, pastX, pastY, pastW])
-    b = np.column_stack([pastZ, pastW])
-    c = np.column_stack([futureZ, pastZ, pastW])
-    d = np.column_stack([pastZ, pastX, pastY, pastW])
-
-    dv_result = dv_partition_nd(a, alpha=dvp_alpha)
-    if len(dv_result) < MINIMAL_VALID_NUMBER_OF_DV_PARTITONS:
-        raise ValueError(
-            f'Number of detected bins below minimum: {MINIMAL_VALID_NUMBER_OF_DV_PARTITONS} > {len(dv_result)}'
-        )
-    dimensions = a.shape[1]
-    n_total = a.shape[0]
-
-    futureZ_start, futureZ_end = 0, 1
-    pastZ_start, pastZ_end = futureZ_end, embedding_dimension + 1
-    pastW_start, pastW_end = 3 * embedding_dimension + 1, dimensions
-
-    cjte: float = 0
-    for dv_part in dv_result:
-        na = dv_part['N']
-        nb = get_points_from_range(b, dv_part, ranges=((pastZ_start, pastZ_end), (pastW_start, pastW_end)))
-        nc = get_points_from_range(c, dv_part, ranges=((futureZ_start, pastZ_end), (pastW_start, pastW_end)))
-        nd = get_points_from_range(d, dv_part, ranges=((pastZ_start, pastW_end),))
-
-        cjte += na / n_total * (np.log2(na * nb) - np.log2(nc * nd))
-
-    return cjte
+    CJTE_{(X,Y)->Z|W} = I(futureZ; pastX, pastY | pastZ, pastW)
+    CJTE_{(X,Y)->Z|Y} = I(futureZ; pastX | pastZ, pastY)
+    """
+    signals = {'Z': signalZ, 'X': signalX, 'Y': signalY}
+    if signalW is None:
+        return get_embedded_blocks(signals, 'Z', time_delay, embedding_dimension), ['pastX'], ['pastZ', 'pastY']
+    signals['W'] = signalW
+    return get_embedded_blocks(signals, 'Z', time_delay, embedding_dimension), ['pastX', 'pastY'], ['pastZ', 'pastW']
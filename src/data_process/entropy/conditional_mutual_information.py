@@ -0,0 +1,241 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Literal, overload
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.common.constants import DEFAULT_SIGNIFICANCE_LEVEL
+from src.common.logger import logger
+from src.common.mytypes import FloatArray
+from src.data_process.entropy.approximate import (
+    DEFAULT_EXACT_MAX_POINTS,
+    DEFAULT_MAX_PARTITION_POINTS,
+    ApproximateEstimate,
+    dv_estimate_approximate,
+)
+from src.data_process.entropy.dvp import dv_partition_nd
+from src.data_process.entropy.utils import (
+    MINIMAL_VALID_NUMBER_OF_DV_PARTITONS,
+    ColumnRanges,
+    MarginalRanges,
+    count_points_in_marginal_spaces,
+    get_future_vector,
+    get_local_values,
+    get_partitions_bounds,
+    get_past_vectors,
+)
+
+type ColumnBlocks = dict[str, NDArray[np.integer]]
+# (L, d) mins and maxs of the leaves of a partitioning and their (L,) counts
+type PartitionBounds = tuple[NDArray[np.floating], NDArray[np.floating], NDArray[np.integer]]
+
+
+@dataclass
+class CMIQuery:
+    """
+    Plan of a conditional mutual information estimate:
+    the joint space to partition and ranges of its columns spanning the marginal spaces
+    b: [conditioning], c: [target, conditioning], d: [conditioning, sources].
+    """
+
+    joint: NDArray[np.integer]
+    marginal_ranges: MarginalRanges
+
+
+def plan_cmi_query(
+    blocks: ColumnBlocks,
+    target: Sequence[str],
+    sources: Sequence[str],
+    conditioning: Sequence[str] = (),
+) -> CMIQuery:
+    """
+    Lays out the used blocks in the order of `blocks` and works out the column ranges of the marginal spaces.
+    Adjacent blocks of the same marginal space are merged into one range.
+    """
+    names = [*target, *sources, *conditioning]
+    if len(set(names)) != len(names):
+        raise ValueError(f'Blocks cannot be shared between target, sources and conditioning: {names}')
+    if missing := [name for name in names if name not in blocks]:
+        raise ValueError(f'Missing blocks: {missing}')
+    if len({len(blocks[name]) for name in names}) != 1:
+        lengths = ', '.join(f'{name}:{len(blocks[name])}' for name in names)
+        raise ValueError(f'Blocks should have the same number of points, instead have: {lengths}')
+
+    used_blocks = [(name, block) for name, block in blocks.items() if name in names]
+    joint = np.column_stack([block for _, block in used_blocks])
+
+    block_ranges: dict[str, tuple[int, int]] = {}
+    start = 0
+    for name, block in used_blocks:
+        width = 1 if block.ndim == 1 else block.shape[1]
+        block_ranges[name] = (start, start + width)
+        start += width
+
+    def get_ranges(space: set[str]) -> ColumnRanges:
+        ranges: list[tuple[int, int]] = []
+        for name, _ in used_blocks:
+            if name not in space:
+                continue
+            block_start, block_stop = block_ranges[name]
+            if ranges and ranges[-1][1] == block_start:
+                ranges[-1] = (ranges[-1][0], block_stop)
+            else:
+                ranges.append((block_start, block_stop))
+        return tuple(ranges)
+
+    return CMIQuery(
+        joint=joint,
+        marginal_ranges=(
+            get_ranges({*conditioning}),
+            get_ranges({*target, *conditioning}),
+            get_ranges({*conditioning, *sources}),
+        ),
+    )
+
+
+@overload
+def cmi_dv(
+    blocks: ColumnBlocks,
+    target: Sequence[str],
+    sources: Sequence[str],
+    conditioning: Sequence[str] = ...,
+    dvp_alpha: float = ...,
+    *,
+    local: Literal[False] = False,
+) -> float: ...
+
+
+@overload
+def cmi_dv(
+    blocks: ColumnBlocks,
+    target: Sequence[str],
+    sources: Sequence[str],
+    conditioning: Sequence[str] = ...,
+    dvp_alpha: float = ...,
+    *,
+    local: Literal[True],
+) -> FloatArray: ...
+
+
+@overload
+def cmi_dv(
+    blocks: ColumnBlocks,
+    target: Sequence[str],
+    sources: Sequence[str],
+    conditioning: Sequence[str] = ...,
+    dvp_alpha: float = ...,
+    *,
+    local: bool,
+) -> float | FloatArray: ...
+
+
+def cmi_dv(
+    blocks: ColumnBlocks,
+    target: Sequence[str],
+    sources: Sequence[str],
+    conditioning: Sequence[str] = (),
+    dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
+    *,
+    local: bool = False,
+) -> float | FloatArray:
+    """
+    Calculates the conditional mutual information I(target; sources | conditioning)
+    over named blocks of ranked columns, using Darbellay-Vajda partitioning of their joint space:
+        sum_a N_a/N * log2(N_a * N_b / (N_c * N_d))
+
+    Counts of all leaves in each distinct marginal space are computed in one batch.
+
+    If local is True, returns the local (pointwise) values for every point. Their mean equals the average value.
+    """
+    query = plan_cmi_query(blocks, target, sources, conditioning)
+    partition_bounds = partition_joint_space(query.joint, dvp_alpha)
+    if local:
+        mins, maxs, _ = partition_bounds
+        return get_local_values(query.joint, mins, maxs, query.marginal_ranges)
+    return cmi_from_partition(query, partition_bounds)
+
+
+def partition_joint_space(joint: NDArray[np.integer], dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL) -> PartitionBounds:
+    """
+    Darbellay-Vajda partitioning of the joint space, e.g. `CMIQuery.joint`, as bounds and counts of its leaves.
+    Raises ValueError if there are too few leaves for an estimate.
+    """
+    dv_result = dv_partition_nd(joint, alpha=dvp_alpha)
+    if len(dv_result) < MINIMAL_VALID_NUMBER_OF_DV_PARTITONS:
+        raise ValueError(
+            f'Number of detected bins below minimum: {MINIMAL_VALID_NUMBER_OF_DV_PARTITONS} > {len(dv_result)}'
+        )
+    return get_partitions_bounds(dv_result)
+
+
+def cmi_from_partition(query: CMIQuery, partition_bounds: PartitionBounds) -> float:
+    """
+    Estimates the conditional mutual information of the query on a partitioning of its joint space,
+    which can be shared by queries of the same joint space, e.g. JTE_{(X,Y)->Z} and CJTE_{(X,Y)->Z|Y}.
+    """
+    mins, maxs, na = partition_bounds
+    n_total = query.joint.shape[0]
+    nb, nc, nd = count_points_in_marginal_spaces(query.joint, mins, maxs, na, query.marginal_ranges)
+    return float(np.sum(na / n_total * (np.log2(na * nb) - np.log2(nc * nd))))
+
+
+def cmi_dv_approx(
+    blocks: ColumnBlocks,
+    target: Sequence[str],
+    sources: Sequence[str],
+    conditioning: Sequence[str] = (),
+    dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
+    max_partition_points: int = DEFAULT_MAX_PARTITION_POINTS,
+    exact_max_points: int = DEFAULT_EXACT_MAX_POINTS,
+) -> ApproximateEstimate:
+    """
+    Approximates the conditional mutual information I(target; sources | conditioning) for long signals,
+    with a bound of its error. See `dv_estimate_approximate`.
+    """
+    query = plan_cmi_query(blocks, target, sources, conditioning)
+    return dv_estimate_approximate(
+        query.joint,
+        query.marginal_ranges,
+        max_partition_points=max_partition_points,
+        dvp_alpha=dvp_alpha,
+        exact_max_points=exact_max_points,
+    )
+
+
+def get_embedded_blocks(
+    signals: dict[str, NDArray[np.floating]],
+    target_name: str,
+    time_delay: int,
+    embedding_dimension: int,
+) -> ColumnBlocks:
+    """
+    Embeds the signals into ranked blocks: future<target_name> followed by past<name> of every signal,
+    in the order of `signals`.
+    """
+    if len({len(signal) for signal in signals.values()}) != 1:
+        lengths = ', '.join(f'{name}:{len(signal)}' for name, signal in signals.items())
+        logger.error(
+            f"""Signals should have the same legth, instead have: \n
+            {lengths}"""
+        )
+        raise ValueError('time series entries need to have same length')
+
+    return {
+        f'future{target_name}': get_future_vector(signals[target_name], d=embedding_dimension, tau=time_delay),
+        **{
+            f'past{name}': get_past_vectors(signal, d=embedding_dimension, tau=time_delay)
+            for name, signal in signals.items()
+        },
+    }
+
+
+def embed_signal(signal: NDArray[np.floating], time_delay: int, embedding_dimension: int) -> ColumnBlocks:
+    """
+    Ranked blocks of a single signal: its future vector ('future') and past vectors ('past'),
+    as used by `get_embedded_blocks`, so embeddings can be shared between estimates of several signals.
+    """
+    return {
+        'future': get_future_vector(signal, d=embedding_dimension, tau=time_delay),
+        'past': get_past_vectors(signal, d=embedding_dimension, tau=time_delay),
+    }
@@ -1,64 +1,92 @@
+from typing import Literal, overload
+
 import numpy as np
 from numpy.typing import NDArray
 
 from src.common.constants import DEFAULT_EMBEDDING_DIMENSION, DEFAULT_SIGNIFICANCE_LEVEL, DEFAULT_TIME_DELAY
-from src.common.logger import logger
-from src.data_process.entropy.dvp import dv_partition_nd
-from src.data_process.entropy.utils import (
-    MINIMAL_VALID_NUMBER_OF_DV_PARTITONS,
-    get_future_vector,
-    get_past_vectors,
-    get_points_from_range,
+from src.common.mytypes import FloatArray
+from src.data_process.entropy.approximate import (
+    DEFAULT_EXACT_MAX_POINTS,
+    DEFAULT_MAX_PARTITION_POINTS,
+    ApproximateEstimate,
 )
+from src.data_process.entropy.conditional_mutual_information import cmi_dv, cmi_dv_approx, get_embedded_blocks
 
 
+@overload
 def cte_dv(
     signalX: NDArray[np.floating],
     signalY: NDArray[np.floating],
     signalZ: NDArray[np.floating],
-    time_delay: int = DEFAULT_TIME_DELAY,
-    embedding_dimension: int = DEFAULT_EMBEDDING_DIMENSION,
-    dvp_alpha=DEFAULT_SIGNIFICANCE_LEVEL,
-) -> float:
-    """
-    Calculates the conditional transfer entropy of CTE_{Y->X|Z}
-    """
-    if not len(signalX) == len(signalY) == len(signalZ):
-        logger.error(
-            f"""Signals should have the same legth, instead have: \n
-            X:{len(signalX)}, Y:{len(signalY)}, Z:{len(signalZ)}"""
-        )
-        raise ValueError('time series entries need to have same length')
+    time_delay: int = ...,
+    embedding_dimension: int = ...,
+    dvp_alpha: float = ...,
+    *,
+    local: Literal[False] = False,
+) -> float: ...
 
-    futureX = get_future_vector(signalX, d=embedding_dimension, tau=time_delay)
-    pastX, pastY, pastZ = (
-        get_past_vectors(signal, d=embedding_dimension, tau=time_delay) for signal in [signalX, signalY, signalZ]
-    )
 
-    a = np.column_stack([futureX, pastX, pastY, pastZ])
-    b = np.column_stack([pastX, pastZ])
-    c = np.column_stack([futureX, pastX, pastZ])
-    d = np.column_stack([pastX, pastY, pastZ])
+@overload
+def cte_dv(
+    signalX: NDArray[np.floating],
+    signalY: NDArray[np.floating],
+    signalZ: NDArray[np.floating],
+    time_delay: int = ...,
+    embedding_dimension: int = ...,
+    dvp_alpha: float = ...,
+    *,
+    local: Literal[True],
+) -> FloatArray: ...
 
-    dv_result = dv_partition_nd(a, alpha=dvp_alpha)
-    if len(dv_result) < MINIMAL_VALID_NUMBER_OF_DV_PARTITONS:
-        raise ValueError(
-            f'Number of detected bins below minimum: {MINIMAL_VALID_NUMBER_OF_DV_PARTITONS} > {len(dv_result)}'
-        )
-    dimensions = a.shape[1]
-    n_total = a.shape[0]
 
-    futureX_start, futureX_end = 0, 1
-    pastX_start, pastX_end = futureX_end, embedding_dimension + 1
-    pastZ_start, pastZ_end = 2 * embedding_dimension + 1, dimensions
+def cte_dv(
+    signalX: NDArray[np.floating],
+    signalY: NDArray[np.floating],
+    signalZ: NDArray[np.floating],
+    time_delay: int = DEFAULT_TIME_DELAY,
+    embedding_dimension: int = DEFAULT_EMBEDDING_DIMENSION,
+    dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
+    *,
+    local: bool = False,
+) -> float | FloatArray:
+    """
+    Calculates the conditional transfer entropy of CTE_{Y->X|Z} = I(futureX; pastY | pastX, pastZ)
 
-    cte: float = 0
-    for dv_part in dv_result:
-        na = dv_part['N']
-        nb = get_points_from_range(b, dv_part, ranges=((pastX_start, pastX_end), (pastZ_start, pastZ_end)))
-        nc = get_points_from_range(c, dv_part, ranges=((futureX_start, pastX_end), (pastZ_start, pastZ_end)))
-        nd = get_points_from_range(d, dv_part, ranges=((pastX_start, pastZ_end),))
+    If local is True, returns the local (pointwise) values for every sample of the future vector,
+    i.e. aligned with signal[embedding_dimension * time_delay:]. Their mean equals the average value.
+    """
+    blocks = get_embedded_blocks({'X': signalX, 'Y': signalY, 'Z': signalZ}, 'X', time_delay, embedding_dimension)
+    return cmi_dv(
+        blocks,
+        target=['futureX'],
+        sources=['pastY'],
+        conditioning=['pastX', 'pastZ'],
+        dvp_alpha=dvp_alpha,
+        local=local,
+    )
 
-        cte += na / n_total * (np.log2(na * nb) - np.log2(nc * nd))
 
-    return cte
+def cte_dv_approx(
+    signalX: NDArray[np.floating],
+    signalY: NDArray[np.floating],
+    signalZ: NDArray[np.floating],
+    time_delay: int = DEFAULT_TIME_DELAY,
+    embedding_dimension: int = DEFAULT_EMBEDDING_DIMENSION,
+    dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
+    max_partition_points: int = DEFAULT_MAX_PARTITION_POINTS,
+    exact_max_points: int = DEFAULT_EXACT_MAX_POINTS,
+) -> ApproximateEstimate:
+    """
+    Approximates the conditional transfer entropy of CTE_{Y->X|Z} for long signals,
+    with a bound of its error. See `dv_estimate_approximate`.
+    """
+    blocks = get_embedded_blocks({'X': signalX, 'Y': signalY, 'Z': signalZ}, 'X', time_delay, embedding_dimension)
+    return cmi_dv_approx(
+        blocks,
+        target=['futureX'],
+        sources=['pastY'],
+        conditioning=['pastX', 'pastZ'],
+        dvp_alpha=dvp_alpha,
+        max_partition_points=max_partition_points,
+        exact_max_points=exact_max_points,
+    )
@@ -6,6 +6,7 @@ from numpy.typing import NDArray
 from scipy.stats import chi2
 
 from src.common.constants import DEFAULT_SIGNIFICANCE_LEVEL
+from src.data_process.entropy.kernels import count_points_in_children, is_numba_enabled, select_points_in_box
 
 
 class DVPartition(TypedDict):
@@ -77,6 +78,8 @@ def _get_current_box_data(
     """
     Selects the subset of data points that fall within the current hyper-box.
     """
+    if is_numba_enabled():
+        return select_points_in_box(data, mins, maxs)
     inside = np.all((data >= mins) & (data <= maxs), axis=1)
     return data[inside]
 
@@ -88,12 +91,16 @@ def _get_children_with_counts(
 ) -> tuple[list[tuple[NDArray[np.integer], NDArray[np.integer]] | None], NDArray[np.integer]]:
     midpoints: NDArray[np.integer] = (mins + maxs) / 2  # type: ignore
     dimensions = len(mins)
+    kernel_counts = count_points_in_children(current_box_data, mins, maxs, midpoints) if is_numba_enabled() else None
 
     children = []
     counts = []
-    for bits in product([0, 1], repeat=dimensions):
+    for child_index, bits in enumerate(product([0, 1], repeat=dimensions)):
         child_mins, child_maxs = _get_child_box_bounds(bits, mins, maxs, midpoints)
-        count = np.all((current_box_data >= child_mins) & (current_box_data <= child_maxs), axis=1).sum()
+        if kernel_counts is not None:
+            count = kernel_counts[child_index]
+        else:
+            count = np.all((current_box_data >= child_mins) & (current_box_data <= child_maxs), axis=1).sum()
         counts.append(count)
         if count == 0:
             children.append(None)
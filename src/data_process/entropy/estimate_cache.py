@@ -0,0 +1,200 @@
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+
+from src.common.logger import logger
+
+_DEFAULT_MAX_ENTRIES = 100_000
+_LOCK_TIMEOUT_SECONDS = 60.0
+_ENTROPY_PACKAGE_DIRECTORY = Path(__file__).parent
+
+type Estimator = Callable[..., float]
+
+# one connection per process and database, shared by all copies of caches sent to the process
+_connections: dict[tuple[int, Path], sqlite3.Connection] = {}
+
+
+@dataclass(frozen=True)
+class CachedEstimate:
+    """
+    Estimate, or the message of the ValueError raised by the estimator, and whether it came from the cache.
+    """
+
+    value: float | None
+    error: str | None
+    is_hit: bool
+
+
+class EstimateCache:
+    """
+    Disk-backed cache of estimates, e.g. of te_dv or cjte_dv, shared between runs and worker processes.
+
+    Entries are keyed by a digest of the input arrays, the estimator, its other arguments (defaults included)
+    and the version of the entropy package code, which changes with any of its source files, so estimates
+    are reused only while all of them are unchanged. Estimation errors (ValueError) are cached as well.
+
+    The cache is an SQLite database, so concurrent workers can read and write it safely, and it is bounded
+    to `max_entries`, evicting the least recently used entries. Hits and misses of this instance are counted;
+    copies of it in worker processes use `get_or_estimate` and the owner counts their requests with `count`.
+    """
+
+    def __init__(self, path: Path, max_entries: int = _DEFAULT_MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        n_requests = self.hits + self.misses
+        return self.hits / n_requests if n_requests else 0.0
+
+    def estimate(self, estimator: Estimator, *args: Any, **kwargs: Any) -> float:
+        """
+        Returns estimator(*args, **kwargs), from the cache if it was computed before, and counts the request.
+        Raises ValueError if the estimator raised it.
+        """
+        cached = self.get_or_estimate(estimator, *args, **kwargs)
+        self.count(cached.is_hit)
+        if cached.error is not None:
+            raise ValueError(cached.error)
+        return cast(float, cached.value)
+
+    def get_or_estimate(self, estimator: Estimator, *args: Any, **kwargs: Any) -> CachedEstimate:
+        """
+        Like `estimate`, but returns a ValueError of the estimator as the error and does not count the request.
+        """
+        key = get_estimate_key(estimator, *args, **kwargs)
+        return self.get_or_compute(key, lambda: estimator(*args, **kwargs))
+
+    def get_or_compute(self, key: str, compute: Callable[[], float]) -> CachedEstimate:
+        """
+        Like `get_or_estimate` for an estimate computed by `compute` under the key of its estimator
+        (see `get_estimate_key`), e.g. in stages on a partitioning shared with other estimates.
+        """
+        if (cached := self.get(key)) is not None:
+            return cached
+
+        try:
+            value = compute()
+        except ValueError as e:
+            self._put(key, None, str(e))
+            return CachedEstimate(value=None, error=str(e), is_hit=False)
+        self._put(key, value, None)
+        return CachedEstimate(value=value, error=None, is_hit=False)
+
+    def count(self, is_hit: bool) -> None:
+        if is_hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def log_statistics(self) -> None:
+        logger.info(f'Estimate cache: {self.hits} hits, {self.misses} misses (hit rate {self.hit_rate:.1%})')
+
+    def get(self, key: str) -> CachedEstimate | None:
+        """
+        Returns the entry of the key (see `get_estimate_key`), or None if it is not cached.
+        """
+        try:
+            connection = self._connect()
+            with connection:
+                row = connection.execute('SELECT value, error FROM estimates WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    connection.execute('UPDATE estimates SET last_access = ? WHERE key = ?', (time.time(), key))
+        except sqlite3.Error as e:
+            logger.warning(f'Failed to read estimate cache {self.path}\n {e}')
+            return None
+        if row is None:
+            return None
+        value, error = row
+        if error is not None:
+            return CachedEstimate(value=None, error=error, is_hit=True)
+        return CachedEstimate(value=np.nan if value is None else float(value), error=None, is_hit=True)
+
+    def _put(self, key: str, value: float | None, error: str | None) -> None:
+        try:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO estimates (key, value, error, last_access) VALUES (?, ?, ?, ?)',
+                    (key, value, error, time.time()),
+                )
+                (n_entries,) = connection.execute('SELECT COUNT(*) FROM estimates').fetchone()
+                if n_entries > self.max_entries:
+                    connection.execute(
+                        """
+                        DELETE FROM estimates WHERE key IN (
+                            SELECT key FROM estimates ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                        )
+                        """,
+                        (self.max_entries,),
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f'Failed to write estimate cache {self.path}\n {e}')
+
+    def _connect(self) -> sqlite3.Connection:
+        if (connection := _connections.get((os.getpid(), self.path))) is not None:
+            return connection
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=_LOCK_TIMEOUT_SECONDS)
+        connection.execute('PRAGMA journal_mode=WAL')
+        with connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS estimates (
+                    key TEXT PRIMARY KEY, value REAL, error TEXT, last_access REAL NOT NULL
+                )
+                """
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS estimates_last_access ON estimates (last_access)')
+        _connections[os.getpid(), self.path] = connection
+        return connection
+
+
+def get_estimate_key(estimator: Estimator, *args: Any, **kwargs: Any) -> str:
+    """
+    Digest of the estimator, the code version and all arguments; arrays are hashed with dtype and shape.
+    NumPy scalars are digested as the equal Python numbers, e.g. a lag read out of an array.
+    """
+    bound = inspect.signature(estimator).bind(*args, **kwargs)
+    bound.apply_defaults()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{estimator.__module__}.{estimator.__qualname__}:{get_code_version()}'.encode())
+    for name, value in bound.arguments.items():
+        digest.update(name.encode())
+        if isinstance(value, np.ndarray):
+            array = np.ascontiguousarray(value)
+            digest.update(f'{array.dtype.str}{array.shape}'.encode())
+            digest.update(array.view(np.uint8))
+        else:
+            digest.update(json.dumps(value, default=_to_json).encode())
+    return digest.hexdigest()
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'Cannot digest argument of type {type(value).__name__}')
+
+
+@cache
+def get_code_version() -> str:
+    """
+    Digest of the source files of the entropy package.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for source_path in sorted(_ENTROPY_PACKAGE_DIRECTORY.glob('*.py')):
+        digest.update(source_path.name.encode())
+        digest.update(source_path.read_bytes())
+    return digest.hexdigest()
@@ -0,0 +1,57 @@
+from collections.abc import Sequence
+from concurrent.futures import Executor
+from functools import partial
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.common.constants import DEFAULT_EMBEDDING_DIMENSION, DEFAULT_SIGNIFICANCE_LEVEL, DEFAULT_TIME_DELAY
+from src.common.logger import logger
+from src.data_process.entropy.transfer_entropy_dv import te_dv
+
+
+def coarse_grain(signals: NDArray[np.floating], scale: int) -> NDArray[np.floating]:
+    """
+    Coarse-grains (k, N) signals at the given scale: means of consecutive non-overlapping windows of `scale` samples.
+    Samples that do not fill the last window are dropped.
+    """
+    n_windows = signals.shape[-1] // scale
+    return signals[..., : n_windows * scale].reshape(*signals.shape[:-1], n_windows, scale).mean(axis=-1)
+
+
+def te_multiscale(
+    signalX: NDArray[np.floating],
+    signalY: NDArray[np.floating],
+    scales: Sequence[int],
+    time_delay: int = DEFAULT_TIME_DELAY,
+    embedding_dimension: int = DEFAULT_EMBEDDING_DIMENSION,
+    dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
+    executor: Executor | None = None,
+) -> dict[int, float | None]:
+    """
+    Calculates the transfer entropy TE_{Y->X} of coarse-grained signals at every scale.
+    Both signals are coarse-grained together with one reshape-and-mean per scale,
+    and the scales are estimated on the executor if given.
+
+    Scales at which the estimate cannot be calculated (e.g. too short coarse-grained signals) are None.
+    """
+    if len(signalX) != len(signalY):
+        raise ValueError('time series entries need to have same length')
+
+    signals = np.vstack([signalX, signalY])
+    coarse_grained = [coarse_grain(signals, scale) for scale in scales]
+    estimate = partial(_te_or_none, time_delay=time_delay, embedding_dimension=embedding_dimension, dvp_alpha=dvp_alpha)
+    values = executor.map(estimate, coarse_grained) if executor is not None else map(estimate, coarse_grained)
+    return dict(zip(scales, values, strict=True))
+
+
+def _te_or_none(
+    signals: NDArray[np.floating], time_delay: int, embedding_dimension: int, dvp_alpha: float
+) -> float | None:
+    try:
+        return te_dv(
+            signals[0], signals[1], time_delay=time_delay, embedding_dimension=embedding_dimension, dvp_alpha=dvp_alpha
+        )
+    except ValueError as e:
+        logger.warning(f'TE calculation error for coarse-grained signals of length {signals.shape[1]}: {e}')
+        return None
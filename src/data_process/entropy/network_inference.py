@@ -0,0 +1,246 @@
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.common.constants import DEFAULT_SIGNIFICANCE_LEVEL
+from src.common.logger import logger
+from src.common.mytypes import FloatArray
+from src.data_process.entropy.conditional_mutual_information import cmi_dv
+from src.data_process.entropy.utils import rank_transform
+
+_DEFAULT_MAX_LAG = 3
+_DEFAULT_N_SURROGATES = 100
+_ORIGINAL_DATA = -1
+_FUTURE_BLOCK_NAME = 'future'
+_CHUNKS_PER_WORKER = 4
+
+# (candidate, conditioning set, surrogate index or _ORIGINAL_DATA)
+type CMIQueryKey = tuple[str, frozenset[str], int]
+
+
+@dataclass
+class ConditioningSet:
+    """
+    Past variables selected for a target, in order of selection,
+    with their conditional mutual information with the target's future given the other selected variables.
+    """
+
+    target: str
+    variables: list[str] = field(default_factory=list)
+    cmi: list[float] = field(default_factory=list)
+    p_values: list[float] = field(default_factory=list)
+
+
+class CandidateEvaluator:
+    """
+    Evaluates I(future target; candidate | conditioning) of lagged past variables.
+
+    Ranked lag columns are computed once and shared between targets. Every evaluation,
+    including evaluations on surrogates, is cached, so the same query is never computed twice,
+    and evaluations that are not cached are run in parallel on the executor.
+    """
+
+    def __init__(
+        self,
+        signals: dict[str, FloatArray],
+        max_lag: int = _DEFAULT_MAX_LAG,
+        dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
+        seed: int = 0,
+        executor: Executor | None = None,
+    ) -> None:
+        if len({len(signal) for signal in signals.values()}) != 1:
+            raise ValueError('time series entries need to have same length')
+        self.signals = signals
+        self.max_lag = max_lag
+        self.dvp_alpha = dvp_alpha
+        self.seed = seed
+        self.executor = executor
+        self.candidates = get_lag_names(signals, max_lag)
+        self._columns = {
+            get_lag_name(name, lag): rank_transform(signal[max_lag - lag : len(signal) - lag])
+            for name, signal in signals.items()
+            for lag in range(1, max_lag + 1)
+        }
+        self._future: NDArray[np.integer] | None = None
+        self._cache: dict[CMIQueryKey, float] = {}
+        self.n_evaluations = 0
+        self.n_cache_hits = 0
+
+    def set_target(self, target: str) -> None:
+        self._future = rank_transform(self.signals[target][self.max_lag :])
+        self._cache.clear()
+        self.n_evaluations = 0
+        self.n_cache_hits = 0
+
+    def evaluate(self, keys: Iterable[CMIQueryKey]) -> list[float]:
+        keys = list(keys)
+        missing = list(dict.fromkeys(key for key in keys if key not in self._cache))
+        self.n_cache_hits += len(keys) - len(missing)
+        self.n_evaluations += len(missing)
+
+        tasks = [self._get_task(key) for key in missing]
+        if self.executor is None:
+            values = list(map(_evaluate_cmi, tasks))
+        else:
+            values = list(self.executor.map(_evaluate_cmi, tasks, chunksize=_get_chunksize(len(tasks))))
+        self._cache.update(zip(missing, values, strict=True))
+        return [self._cache[key] for key in keys]
+
+    def _get_task(self, key: CMIQueryKey) -> tuple[dict[str, NDArray[np.integer]], list[str], list[str], float]:
+        if self._future is None:
+            raise ValueError('Target is not set')
+        candidate, conditioning, surrogate_index = key
+        candidate_column = self._columns[candidate]
+        if surrogate_index != _ORIGINAL_DATA:
+            rng = np.random.default_rng((self.seed, surrogate_index))
+            candidate_column = candidate_column[rng.permutation(len(candidate_column))]
+
+        blocks = {
+            _FUTURE_BLOCK_NAME: self._future,
+            candidate: candidate_column,
+            **{name: self._columns[name] for name in sorted(conditioning)},
+        }
+        return blocks, [candidate], sorted(conditioning), self.dvp_alpha
+
+
+def select_conditioning_set(
+    evaluator: CandidateEvaluator,
+    target: str,
+    n_surrogates: int = _DEFAULT_N_SURROGATES,
+    alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
+) -> ConditioningSet:
+    """
+    Greedily builds the conditioning set of past variables of the target.
+
+    At every step the candidate with the highest I(future target; candidate | selected) is added,
+    if it is significant against the maximum statistic over all remaining candidates on surrogates
+    (the candidate's samples shuffled). Afterwards the selected variables are pruned with the same test,
+    given all other selected variables, which mostly reuses the cached evaluations.
+    """
+    evaluator.set_target(target)
+    selected: list[str] = []
+    remaining = list(evaluator.candidates)
+
+    while remaining:
+        conditioning = frozenset(selected)
+        values = evaluator.evaluate((candidate, conditioning, _ORIGINAL_DATA) for candidate in remaining)
+        best = int(np.argmax(values))
+
+        surrogate_values = np.array(
+            evaluator.evaluate(
+                (candidate, conditioning, surrogate_index)
+                for surrogate_index in range(n_surrogates)
+                for candidate in remaining
+            )
+        ).reshape(n_surrogates, len(remaining))
+        p_value = _get_p_value(values[best], surrogate_values.max(axis=1))
+        if p_value >= alpha:
+            break
+        logger.debug(f'Selected {remaining[best]} for {target} (CMI: {values[best]:.4f}, p: {p_value:.3f})')
+        selected.append(remaining.pop(best))
+
+    result = _prune(evaluator, target, selected, n_surrogates, alpha)
+    logger.info(
+        f'Conditioning set of {target}: {result.variables} '
+        f'({evaluator.n_evaluations} evaluations, {evaluator.n_cache_hits} cache hits)'
+    )
+    return result
+
+
+def infer_network(
+    signals: dict[str, FloatArray],
+    targets: list[str] | None = None,
+    max_lag: int = _DEFAULT_MAX_LAG,
+    n_surrogates: int = _DEFAULT_N_SURROGATES,
+    alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
+    n_workers: int | None = None,
+    seed: int = 0,
+    dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
+) -> dict[str, ConditioningSet]:
+    """
+    Selects the conditioning set of past variables for every target (all signals by default).
+    Candidates are evaluated in parallel on `n_workers` processes, or serially if n_workers is 1.
+    `alpha` is the significance level of the surrogate tests, `dvp_alpha` the one of the partitioning.
+    """
+    with _get_executor(n_workers) as executor:
+        evaluator = CandidateEvaluator(signals, max_lag=max_lag, dvp_alpha=dvp_alpha, seed=seed, executor=executor)
+        return {
+            target: select_conditioning_set(evaluator, target, n_surrogates=n_surrogates, alpha=alpha)
+            for target in (targets if targets is not None else list(signals))
+        }
+
+
+def get_lag_name(signal_name: str, lag: int) -> str:
+    return f'{signal_name}[t-{lag}]'
+
+
+def get_lag_names(signals: dict[str, FloatArray], max_lag: int) -> list[str]:
+    return [get_lag_name(name, lag) for name in signals for lag in range(1, max_lag + 1)]
+
+
+def _prune(
+    evaluator: CandidateEvaluator,
+    target: str,
+    selected: list[str],
+    n_surrogates: int,
+    alpha: float,
+) -> ConditioningSet:
+    while True:
+        others = [frozenset(selected) - {variable} for variable in selected]
+        values = evaluator.evaluate(
+            (variable, conditioning, _ORIGINAL_DATA) for variable, conditioning in zip(selected, others, strict=True)
+        )
+        p_values = [
+            _get_p_value(
+                value,
+                np.array(
+                    evaluator.evaluate(
+                        (variable, conditioning, surrogate_index) for surrogate_index in range(n_surrogates)
+                    )
+                ),
+            )
+            for variable, conditioning, value in zip(selected, others, values, strict=True)
+        ]
+        weakest = int(np.argmin(values)) if values else None
+        if weakest is None or p_values[weakest] < alpha:
+            return ConditioningSet(target=target, variables=selected, cmi=values, p_values=p_values)
+        logger.debug(f'Pruned {selected[weakest]} from {target} (p: {p_values[weakest]:.3f})')
+        selected = selected[:weakest] + selected[weakest + 1 :]
+
+
+def _get_chunksize(n_tasks: int) -> int:
+    # a single evaluation takes milliseconds, so tasks are sent in chunks to amortize inter-process overhead
+    return max(1, n_tasks // (_CHUNKS_PER_WORKER * (os.process_cpu_count() or 1)))
+
+
+def _get_p_value(value: float, surrogate_values: NDArray[np.floating]) -> float:
+    return float((1 + np.sum(surrogate_values >= value)) / (1 + len(surrogate_values)))
+
+
+def _evaluate_cmi(task: tuple[dict[str, NDArray[np.integer]], list[str], list[str], float]) -> float:
+    blocks, sources, conditioning, dvp_alpha = task
+    try:
+        return cmi_dv(
+            blocks,
+            target=[_FUTURE_BLOCK_NAME],
+            sources=sources,
+            conditioning=conditioning,
+            dvp_alpha=dvp_alpha,
+        )
+    except ValueError:
+        # partitioning found no structure, so there is no information to be gained
+        return 0.0
+
+
+@contextmanager
+def _get_executor(n_workers: int | None) -> Iterator[Executor | None]:
+    if n_workers == 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        yield executor
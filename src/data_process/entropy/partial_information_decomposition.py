@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.common.constants import DEFAULT_EMBEDDING_DIMENSION, DEFAULT_SIGNIFICANCE_LEVEL, DEFAULT_TIME_DELAY
+from src.common.logger import logger
+from src.data_process.entropy.conditional_mutual_information import get_embedded_blocks, plan_cmi_query
+from src.data_process.entropy.dvp import dv_partition_nd
+from src.data_process.entropy.utils import (
+    MINIMAL_VALID_NUMBER_OF_DV_PARTITONS,
+    count_points_in_marginal_spaces,
+    get_partitions_bounds,
+)
+
+
+@dataclass
+class PartialInformationDecomposition:
+    redundancy: float
+    unique_x: float
+    unique_y: float
+    synergy: float
+    te_x: float
+    te_y: float
+    jte: float
+
+
+def pid_dv(
+    signalX: NDArray[np.floating],
+    signalY: NDArray[np.floating],
+    signalZ: NDArray[np.floating],
+    time_delay: int = DEFAULT_TIME_DELAY,
+    embedding_dimension: int = DEFAULT_EMBEDDING_DIMENSION,
+    dvp_alpha: float = DEFAULT_SIGNIFICANCE_LEVEL,
+) -> PartialInformationDecomposition:
+    """
+    Decomposes the joint transfer entropy JTE_{(X,Y)->Z} into redundant, unique and synergistic parts,
+    using the minimum mutual information redundancy:
+        R = min(TE_{X->Z}, TE_{Y->Z})
+        U_X = TE_{X->Z} - R
+        U_Y = TE_{Y->Z} - R
+        S = JTE_{(X,Y)->Z} - TE_{X->Z} - TE_{Y->Z} + R
+
+    All terms are computed from a single partitioning of [futureZ, pastZ, pastX, pastY], with counts of
+    projections of its leaves on the marginal spaces of every term in one batch. JTE equals jte_dv, while
+    TE_{X->Z} and TE_{Y->Z} are estimated on the joint leaves and are typically lower than te_dv.
+
+    The single-source terms are bounded to [0, JTE] (and JTE to non-negative values), so the four parts are
+    non-negative and add up to JTE even where the estimator's variance breaks the chain rule.
+    """
+    if not len(signalX) == len(signalY) == len(signalZ):
+        logger.error(
+            f"""Signals should have the same legth, instead have: \n
+            X:{len(signalX)}, Y:{len(signalY)}, Z:{len(signalZ)}"""
+        )
+        raise ValueError('time series entries need to have same length')
+
+    blocks = get_embedded_blocks({'Z': signalZ, 'X': signalX, 'Y': signalY}, 'Z', time_delay, embedding_dimension)
+    query = plan_cmi_query(blocks, target=['futureZ'], sources=['pastX', 'pastY'], conditioning=['pastZ'])
+    a = query.joint
+
+    dv_result = dv_partition_nd(a, alpha=dvp_alpha)
+    if len(dv_result) < MINIMAL_VALID_NUMBER_OF_DV_PARTITONS:
+        raise ValueError(
+            f'Number of detected bins below minimum: {MINIMAL_VALID_NUMBER_OF_DV_PARTITONS} > {len(dv_result)}'
+        )
+    n_total = a.shape[0]
+    mins, maxs, na = get_partitions_bounds(dv_result)
+
+    futureZ = (0, 1)
+    pastZ = (1, embedding_dimension + 1)
+    pastX = (pastZ[1], pastZ[1] + embedding_dimension)
+    pastY = (pastX[1], pastX[1] + embedding_dimension)
+    (
+        n_pastZ,
+        n_futureZ_pastZ,
+        n_pastZ_sources,
+        n_futureZ_pastZ_pastX,
+        n_pastZ_pastX,
+        n_futureZ_pastZ_pastY,
+        n_pastZ_pastY,
+    ) = count_points_in_marginal_spaces(
+        a,
+        mins,
+        maxs,
+        na,
+        (
+            *query.marginal_ranges,
+            ((futureZ[0], pastX[1]),),
+            ((pastZ[0], pastX[1]),),
+            ((futureZ[0], pastZ[1]), pastY),
+            (pastZ, pastY),
+        ),
+    )
+
+    def get_weighted_sum(n_joint: NDArray[np.integer], n_conditioning: NDArray[np.integer]) -> float:
+        # sum over leaves of N_a/N * log2(N_joint * N_pastZ / (N_futureZ_pastZ * N_conditioning))
+        return float(np.sum(na / n_total * (np.log2(n_joint * n_pastZ) - np.log2(n_futureZ_pastZ * n_conditioning))))
+
+    jte = max(get_weighted_sum(na, n_pastZ_sources), 0.0)
+    te_x = float(np.clip(get_weighted_sum(n_futureZ_pastZ_pastX, n_pastZ_pastX), 0.0, jte))
+    te_y = float(np.clip(get_weighted_sum(n_futureZ_pastZ_pastY, n_pastZ_pastY), 0.0, jte))
+
+    redundancy = min(te_x, te_y)
+    return PartialInformationDecomposition(
+        redundancy=redundancy,
+        unique_x=te_x - redundancy,
+        unique_y=te_y - redundancy,
+        synergy=jte - te_x - te_y + redundancy,
+        te_x=te_x,
+        te_y=te_y,
+        jte=jte,
+    )
@@ -1,3 +1,4 @@
+from collections.abc import Generator
 from typing import cast
 
 import numpy as np
@@ -6,9 +7,14 @@ from scipy.stats import rankdata
 
 from src.common.mytypes import FloatArray
 from src.data_process.entropy.dvp import DVPartition
+from src.data_process.entropy.kernels import count_points_in_box, is_numba_enabled
 
 MINIMAL_VALID_NUMBER_OF_DV_PARTITONS = 2
 _DEFAULT_RANKING_METHOD = 'average'
+_MAX_BOX_COMPARISONS_PER_CHUNK = 2**24
+
+type ColumnRanges = tuple[tuple[int, int], ...]
+type MarginalRanges = tuple[ColumnRanges, ColumnRanges, ColumnRanges]
 
 
 def get_points_from_range(
@@ -29,9 +35,126 @@ def get_points_from_range(
             maxs = np.hstack([maxs, part_maxs])
 
     mins, maxs = cast(NDArray[np.integer], mins), cast(NDArray[np.integer], maxs)
+    if is_numba_enabled():
+        return count_points_in_box(points, mins, maxs)
     return np.all((points >= mins) & (points <= maxs), axis=1).sum()
 
 
+def get_columns_from_ranges(ranges: ColumnRanges) -> NDArray[np.integer]:
+    """
+    Converts ranges of (start, stop) column slices into a flat array of column indices.
+    """
+    return np.concatenate([np.arange(start, stop) for start, stop in ranges])
+
+
+def get_partitions_bounds(
+    partitions: list[DVPartition],
+) -> tuple[NDArray[np.floating], NDArray[np.floating], NDArray[np.integer]]:
+    """
+    Stacks bounds of the partitions into (L, d) arrays of mins and maxs and (L,) array of counts.
+    """
+    mins = np.array([dv_part['mins'] for dv_part in partitions], dtype=np.float64)
+    maxs = np.array([dv_part['maxs'] for dv_part in partitions], dtype=np.float64)
+    counts = np.array([dv_part['N'] for dv_part in partitions], dtype=np.int64)
+    return mins, maxs, counts
+
+
+def count_points_in_boxes(
+    points: NDArray[np.integer], mins: NDArray[np.floating], maxs: NDArray[np.floating]
+) -> NDArray[np.integer]:
+    """
+    Counts points inside each of the (L, d) hyper-boxes (bounds inclusive).
+    Boxes are processed in chunks so that memory stays bounded for long signals.
+    """
+    counts = np.zeros(len(mins), dtype=np.int64)
+    for chunk in _iterate_box_chunks(len(mins), points.shape):
+        inside = np.all((points >= mins[chunk, None]) & (points <= maxs[chunk, None]), axis=2)
+        counts[chunk] = inside.sum(axis=1)
+    return counts
+
+
+def count_points_in_marginal_boxes(
+    points: NDArray[np.integer], mins: NDArray[np.floating], maxs: NDArray[np.floating], ranges: ColumnRanges
+) -> NDArray[np.integer]:
+    """
+    Counts points inside projections of each of the (L, d) hyper-boxes on the marginal space spanned by `ranges`.
+    """
+    columns = get_columns_from_ranges(ranges)
+    return count_points_in_boxes(points[:, columns], mins[:, columns], maxs[:, columns])
+
+
+def count_points_in_marginal_spaces(
+    points: NDArray[np.integer],
+    mins: NDArray[np.floating],
+    maxs: NDArray[np.floating],
+    na: NDArray[np.integer],
+    marginal_ranges: tuple[ColumnRanges, ...],
+) -> tuple[NDArray[np.integer], ...]:
+    """
+    Counts points inside projections of all boxes on each of the marginal spaces, in one batch per distinct space.
+    Spaces spanning no columns contain all points, and the space spanning all columns gives the counts `na`.
+    """
+    n_points, dimensions = points.shape
+    counts_by_columns: dict[tuple[int, ...], NDArray[np.integer]] = {tuple(range(dimensions)): na}
+
+    marginal_counts: list[NDArray[np.integer]] = []
+    for ranges in marginal_ranges:
+        columns = tuple(get_columns_from_ranges(ranges).tolist()) if ranges else ()
+        if not columns:
+            marginal_counts.append(np.full(len(mins), n_points, dtype=np.int64))
+            continue
+        if columns not in counts_by_columns:
+            counts_by_columns[columns] = count_points_in_marginal_boxes(points, mins, maxs, ranges)
+        marginal_counts.append(counts_by_columns[columns])
+    return tuple(marginal_counts)
+
+
+def assign_points_to_boxes(
+    points: NDArray[np.integer], mins: NDArray[np.floating], maxs: NDArray[np.floating]
+) -> NDArray[np.integer]:
+    """
+    Returns index of the box containing each point, or -1 if the point is not inside any box.
+    Boxes are assumed to be disjoint, as the leaves of Darbellay-Vajda partitioning are.
+    """
+    box_indices = np.full(len(points), -1, dtype=np.int64)
+    for chunk in _iterate_box_chunks(len(mins), points.shape):
+        inside = np.all((points >= mins[chunk, None]) & (points <= maxs[chunk, None]), axis=2)
+        is_assigned = inside.any(axis=0)
+        box_indices[is_assigned] = chunk.start + inside.argmax(axis=0)[is_assigned]
+    return box_indices
+
+
+def get_local_values(
+    points: NDArray[np.integer],
+    mins: NDArray[np.floating],
+    maxs: NDArray[np.floating],
+    marginal_ranges: MarginalRanges,
+) -> NDArray[np.floating]:
+    """
+    Local values log2(N_a * N_b / (N_c * N_d)) of every point, where N_a is the count of the leaf containing it
+    and N_b, N_c, N_d are counts of the leaf's projections on the marginal spaces given by `marginal_ranges`.
+
+    Each point is mapped to its leaf once and all counts are computed in one vectorized pass.
+    Points outside of all leaves get 0, so the mean of the local values equals the estimate.
+    """
+    leaf_indices = assign_points_to_boxes(points, mins, maxs)
+    is_assigned = leaf_indices >= 0
+    na = np.bincount(leaf_indices[is_assigned], minlength=len(mins))
+    nb, nc, nd = count_points_in_marginal_spaces(points, mins, maxs, na, marginal_ranges)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        leaves_local_values = np.log2(na * nb) - np.log2(nc * nd)
+    local_values = np.zeros(len(points))
+    local_values[is_assigned] = leaves_local_values[leaf_indices[is_assigned]]
+    return local_values
+
+
+def _iterate_box_chunks(n_boxes: int, points_shape: tuple[int, ...]) -> Generator[slice]:
+    chunk_size = max(1, _MAX_BOX_COMPARISONS_PER_CHUNK // max(1, points_shape[0] * points_shape[1]))
+    for start in range(0, n_boxes, chunk_size):
+        yield slice(start, min(start + chunk_size, n_boxes))
+
+
 def _get_min_max(dv_part: DVPartition, start: int, stop: int) -> tuple[NDArray[np.integer], NDArray[np.integer]]:
     return dv_part['mins'][start:stop], dv_part['maxs'][start:stop]
 
@@ -19,10 +19,12 @@ class BaroreflexDataLoader(DataLoader):
 
     @override
     def load_single_subject_raw_data(self, subject_directory: Path) -> SubjectData:
-        return {
-            'id': self._get_subject_id(subject_directory),
-            CB_FILE_TYPE.B6: self.load_single_condition_csv_file(subject_directory / CB_FILE_TYPE.B6.csv),
-            CB_FILE_TYPE.B10: self.load_single_condition_csv_file(subject_directory / CB_FILE_TYPE.B10.csv),
-            CB_FILE_TYPE.B15: self.load_single_condition_csv_file(subject_directory / CB_FILE_TYPE.B15.csv),
-            CB_FILE_TYPE.BASELINE: self.load_single_condition_csv_file(subject_directory / CB_FILE_TYPE.BASELINE.csv),
-        }
+        return self._load_conditions(
+            subject_directory,
+            {
+                CB_FILE_TYPE.B6: subject_directory / CB_FILE_TYPE.B6.csv,
+                CB_FILE_TYPE.B10: subject_directory / CB_FILE_TYPE.B10.csv,
+                CB_FILE_TYPE.B15: subject_directory / CB_FILE_TYPE.B15.csv,
+                CB_FILE_TYPE.BASELINE: subject_directory / CB_FILE_TYPE.BASELINE.csv,
+            },
+        )
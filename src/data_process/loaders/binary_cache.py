@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src.common.logger import logger
+from src.common.mytypes import ArrayDataDict
+
+_METADATA_FILE_NAME = 'metadata.json'
+_KEY_LENGTH = 16
+
+
+class BinaryColumnCache:
+    """
+    Cache of columns parsed from CSV files, stored as one .npy file per column and reloaded memory-mapped.
+
+    Entries are keyed by the source path and are valid only as long as size and modification time
+    of the source file and the requested columns are unchanged, so stale entries are rebuilt automatically.
+    """
+
+    def __init__(self, cache_directory: Path) -> None:
+        self.cache_directory = cache_directory
+
+    def load(self, source_path: Path, columns: dict[str, str]) -> ArrayDataDict | None:
+        entry_directory = self._get_entry_directory(source_path)
+        metadata_path = entry_directory / _METADATA_FILE_NAME
+        if not metadata_path.exists():
+            return None
+        try:
+            metadata = json.loads(metadata_path.read_text(encoding='utf-8'))
+            if metadata != self._get_metadata(source_path, columns):
+                return None
+            return {field_name: np.load(entry_directory / f'{field_name}.npy', mmap_mode='r') for field_name in columns}
+        except (OSError, ValueError) as e:
+            logger.warning(f'Failed to read cache of {source_path}\n {e}')
+            return None
+
+    def save(self, source_path: Path, columns: dict[str, str], data: ArrayDataDict) -> ArrayDataDict:
+        """
+        Stores the columns and returns them memory-mapped from the cache.
+        The metadata is written last, so an interrupted write leaves an entry that is not valid.
+        """
+        entry_directory = self._get_entry_directory(source_path)
+        try:
+            entry_directory.mkdir(parents=True, exist_ok=True)
+            (entry_directory / _METADATA_FILE_NAME).unlink(missing_ok=True)
+            for field_name, values in data.items():
+                _atomic_save(entry_directory / f'{field_name}.npy', np.ascontiguousarray(values, dtype=np.float64))
+            metadata_path = entry_directory / _METADATA_FILE_NAME
+            temporary_path = metadata_path.with_suffix(f'.{os.getpid()}.tmp')
+            temporary_path.write_text(json.dumps(self._get_metadata(source_path, columns)), encoding='utf-8')
+            temporary_path.replace(metadata_path)
+        except OSError as e:
+            logger.warning(f'Failed to cache {source_path}\n {e}')
+            return data
+        return self.load(source_path, columns) or data
+
+    def _get_entry_directory(self, source_path: Path) -> Path:
+        key = hashlib.sha256(str(source_path.resolve()).encode()).hexdigest()[:_KEY_LENGTH]
+        return self.cache_directory / key
+
+    @staticmethod
+    def _get_metadata(source_path: Path, columns: dict[str, str]) -> dict:
+        stat = source_path.stat()
+        return {
+            'source': str(source_path.resolve()),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'columns': {field_name: str.__str__(column) for field_name, column in columns.items()},
+        }
+
+
+def _atomic_save(path: Path, values: np.ndarray) -> None:
+    temporary_path = path.with_suffix(f'.{os.getpid()}.tmp.npy')
+    np.save(temporary_path, values)
+    temporary_path.replace(path)
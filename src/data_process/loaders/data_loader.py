@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import cast
 
@@ -6,11 +9,14 @@ import numpy as np
 import pandas as pd
 from numpy.typing import NDArray
 
+from src.common.constants import RAW_DATA_CACHE_DIRECTORY_PATH
 from src.common.logger import logger
-from src.common.mytypes import ArrayDataDict, SubjectData
+from src.common.mytypes import ArrayDataDict, LazySubjectData, SubjectData
+from src.data_process.loaders.binary_cache import BinaryColumnCache
 
 _DEFAULT_CSV_DECIMAL = ','
 _DEFAULT_CSV_SEPARATOR = ';'
+_DEFAULT_CSV_CHUNK_SIZE = 60_000
 
 
 class CBFileError(Exception):
@@ -18,6 +24,24 @@ class CBFileError(Exception):
 
 
 class DataLoader(ABC):
+    def __init__(
+        self,
+        n_workers: int | None = None,
+        cache_directory: Path | None = RAW_DATA_CACHE_DIRECTORY_PATH,
+        rebuild_cache: bool = False,
+        lazy: bool = False,
+    ) -> None:
+        """
+        n_workers: number of threads loading subjects concurrently, None for the ThreadPoolExecutor default.
+        cache_directory: directory of the binary cache of parsed CSV files, None disables caching.
+        rebuild_cache: parse all CSV files again and overwrite their cache entries.
+        lazy: return subjects as LazySubjectData, loading each condition file on first access.
+        """
+        self.n_workers = n_workers
+        self.rebuild_cache = rebuild_cache
+        self.lazy = lazy
+        self._cache = BinaryColumnCache(cache_directory) if cache_directory is not None else None
+
     @property
     @abstractmethod
     def _data_directory(self) -> Path:
@@ -41,33 +65,85 @@ class DataLoader(ABC):
         pass
 
     def load_all_raw_data(self) -> list[SubjectData]:
-        raw_data: list[SubjectData] = []
+        """
+        Loads all subjects concurrently on a thread pool (CSV parsing releases the GIL),
+        returning them in directory order. Subjects that fail to load are skipped.
+        """
+        subject_directories = []
         for subject_directory in self._data_directory.iterdir():
             if not subject_directory.is_dir():
                 logger.debug(f'Skipping folder: {subject_directory}')
                 continue
-            try:
-                subject_raw_data = self.load_single_subject_raw_data(subject_directory)
-            except CBFileError as e:
-                logger.warning(f'Failed to load all columns in {subject_directory}\n {e}')
-            except FileNotFoundError as e:
-                logger.warning(f'Failed to find all cb files in {subject_directory}\n {e}')
-            except UnicodeDecodeError as e:
-                logger.warning(f'CSV decoding error in {subject_directory}\n {e}')
-            except Exception as e:  # noqa: BLE001
-                logger.error(f'Unexpected exception for {subject_directory}\n {e}')
-
-            if subject_raw_data is not None:
-                raw_data.append(subject_raw_data)
+            subject_directories.append(subject_directory)
+
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            raw_data = [
+                subject_raw_data
+                for subject_raw_data in executor.map(self._try_load_single_subject_raw_data, subject_directories)
+                if subject_raw_data is not None
+            ]
 
         logger.info('Loaded all subjects')
         return raw_data
 
+    def _try_load_single_subject_raw_data(self, subject_directory: Path) -> SubjectData | None:
+        try:
+            return self.load_single_subject_raw_data(subject_directory)
+        except CBFileError as e:
+            logger.warning(f'Failed to load all columns in {subject_directory}\n {e}')
+        except FileNotFoundError as e:
+            logger.warning(f'Failed to find all cb files in {subject_directory}\n {e}')
+        except UnicodeDecodeError as e:
+            logger.warning(f'CSV decoding error in {subject_directory}\n {e}')
+        except Exception as e:  # noqa: BLE001
+            logger.error(f'Unexpected exception for {subject_directory}\n {e}')
+        return None
+
+    def _load_conditions(self, subject_directory: Path, condition_file_paths: dict[str, Path]) -> SubjectData:
+        """
+        Loads the condition files of a subject, or only checks that they exist if loading is lazy.
+        """
+        subject_id = self._get_subject_id(subject_directory)
+        if not self.lazy:
+            return {
+                'id': subject_id,
+                **{
+                    condition: self.load_single_condition_csv_file(cb_file_path)
+                    for condition, cb_file_path in condition_file_paths.items()
+                },
+            }
+
+        if missing := [str(path) for path in condition_file_paths.values() if not path.exists()]:
+            raise FileNotFoundError(f'Files: {missing}')
+        return LazySubjectData(
+            subject_id,
+            {
+                condition: partial(self.load_single_condition_csv_file, cb_file_path)
+                for condition, cb_file_path in condition_file_paths.items()
+            },
+        )
+
     def load_single_condition_csv_file(self, cb_file_path: Path) -> ArrayDataDict:
+        """
+        Loads columns of a condition file, memory-mapped from the binary cache if it is up to date.
+        """
         if not cb_file_path.exists():
             raise FileNotFoundError(f'File: {cb_file_path}')
+        if self._cache is None:
+            return self._read_condition_csv_file(cb_file_path)
+        if not self.rebuild_cache and (cached_data := self._cache.load(cb_file_path, self._csv_columns)) is not None:
+            return cached_data
+        return self._cache.save(cb_file_path, self._csv_columns, self._read_condition_csv_file(cb_file_path))
+
+    def _read_condition_csv_file(self, cb_file_path: Path) -> ArrayDataDict:
         try:
-            subject_df = pd.read_csv(cb_file_path, sep=self._csv_separator, decimal=self._csv_decimal)
+            subject_df = pd.read_csv(
+                cb_file_path,
+                sep=self._csv_separator,
+                decimal=self._csv_decimal,
+                usecols=list(self._csv_columns.values()),
+                dtype=dict.fromkeys(self._csv_columns.values(), np.float64),
+            )
             return {
                 field_name: cast(NDArray[np.floating], subject_df[csv_column_name].values)
                 for field_name, csv_column_name in self._csv_columns.items()
@@ -77,6 +153,34 @@ class DataLoader(ABC):
         except (ValueError, KeyError) as e:
             raise CBFileError(f'File: {cb_file_path}\n{e}') from e
 
+    def iter_condition_csv_chunks(
+        self, cb_file_path: Path, chunk_size: int = _DEFAULT_CSV_CHUNK_SIZE
+    ) -> Iterator[ArrayDataDict]:
+        """
+        Reads columns of a condition file in chunks of `chunk_size` rows,
+        so recordings of any length are streamed with bounded memory.
+        """
+        if not cb_file_path.exists():
+            raise FileNotFoundError(f'File: {cb_file_path}')
+        try:
+            with pd.read_csv(
+                cb_file_path,
+                sep=self._csv_separator,
+                decimal=self._csv_decimal,
+                usecols=list(self._csv_columns.values()),
+                dtype=dict.fromkeys(self._csv_columns.values(), np.float64),
+                chunksize=chunk_size,
+            ) as reader:
+                for chunk_df in reader:
+                    yield {
+                        field_name: cast(NDArray[np.floating], chunk_df[csv_column_name].values)
+                        for field_name, csv_column_name in self._csv_columns.items()
+                    }
+        except UnicodeDecodeError as e:
+            raise Exception(f'File: {cb_file_path}\n{e}') from e
+        except (ValueError, KeyError) as e:
+            raise CBFileError(f'File: {cb_file_path}\n{e}') from e
+
     @staticmethod
     def _get_subject_id(subject_directory) -> int:
         return int(str(subject_directory).split('_')[-1])
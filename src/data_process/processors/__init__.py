@@ -1 +1,2 @@
 from .baroreflex_data_processor import BaroreflexDataProcessor
+from .realtime import RealtimeBaroreflexProcessor
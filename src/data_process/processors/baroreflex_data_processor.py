@@ -1,20 +1,80 @@
-from typing import override
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, override
 
+import numpy as np
+from numpy.typing import NDArray
+
+from src.common.constants import PROCESSED_DATA_CACHE_DIRECTORY_PATH, SAMPLING_FREQUENCY
 from src.common.mytypes import ArrayDataDict
+from src.data_process.processors.beat_annotation import (
+    DEFAULT_FIND_PEAKS_METHOD,
+    DEFAULT_MIN_DELAY,
+    BeatAnnotation,
+    annotate_beats,
+)
 from src.data_process.processors.data_processor import DataProcessor
-from src.data_process.processors.utils import adjust_etco2, get_hp, get_peaks, get_sap
+from src.data_process.processors.streaming import stream_peaks
+from src.data_process.processors.utils import adjust_etco2, get_hp, get_sap
 
 
 class BaroreflexDataProcessor(DataProcessor):
+    def __init__(
+        self,
+        release_raw_data: bool = False,
+        n_workers: int | None = 1,
+        cache_directory: Path | None = PROCESSED_DATA_CACHE_DIRECTORY_PATH,
+        find_peaks_method: str = DEFAULT_FIND_PEAKS_METHOD,
+        mindelay: float = DEFAULT_MIN_DELAY,
+    ) -> None:
+        """
+        find_peaks_method, mindelay: peak detection of `annotate_beats`.
+        """
+        super().__init__(release_raw_data=release_raw_data, n_workers=n_workers, cache_directory=cache_directory)
+        self.find_peaks_method = find_peaks_method
+        self.mindelay = mindelay
+
     @override
     def _process_single_cb(self, raw_data: ArrayDataDict) -> ArrayDataDict:
+        abp, etco2 = self._get_signals(raw_data)
+        annotation = annotate_beats(abp, method=self.find_peaks_method, mindelay=self.mindelay)
+        return self._get_beat_series(abp, etco2, annotation, annotation)
+
+    @override
+    def get_parameters(self) -> dict[str, Any]:
+        return {
+            **super().get_parameters(),
+            'sampling_rate': SAMPLING_FREQUENCY,
+            'find_peaks_method': self.find_peaks_method,
+            'mindelay': self.mindelay,
+        }
+
+    def process_stream(self, raw_chunks: Iterable[ArrayDataDict]) -> Iterator[ArrayDataDict]:
+        """
+        Streaming counterpart of processing a single condition: yields blocks of consecutive beats
+        of chunks of a long recording (e.g. from DataLoader.iter_condition_csv_chunks).
+        Concatenated blocks form the beat series of the whole recording.
+        """
+        for block in stream_peaks(raw_chunks, reference_field='abp'):
+            abp, etco2 = self._get_signals(block.signals)
+            yield self._get_beat_series(abp, etco2, block.local_peaks, block.peaks)
+
+    @staticmethod
+    def _get_signals(raw_data: ArrayDataDict) -> tuple[NDArray[np.floating], NDArray[np.floating]]:
         abp = raw_data.get('abp')
         etco2 = raw_data.get('etco2')
         if abp is None or etco2 is None:
             raise ValueError
+        return abp, etco2
 
-        peaks = get_peaks(abp)
-        sap = get_sap(abp, peaks)
+    @staticmethod
+    def _get_beat_series(
+        abp: NDArray[np.floating],
+        etco2: NDArray[np.floating],
+        local_peaks: NDArray[np.integer] | BeatAnnotation,
+        peaks: NDArray[np.integer] | BeatAnnotation,
+    ) -> ArrayDataDict:
+        sap = get_sap(abp, local_peaks)
         hp = get_hp(peaks)
-        etco2_adjusted = adjust_etco2(etco2, peaks)
+        etco2_adjusted = adjust_etco2(etco2, local_peaks)
         return {'sap': sap, 'hp': hp, 'etco2': etco2_adjusted}
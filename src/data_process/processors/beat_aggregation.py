@@ -0,0 +1,74 @@
+from enum import Enum
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.common.mytypes import FloatArray
+
+
+class BeatStatistic(Enum):
+    MEAN = 'mean'
+    MAX = 'max'
+    MIN = 'min'
+    VALUE = 'value'  # value at the peak index
+
+
+class BeatWindow(Enum):
+    PREVIOUS_BEAT = 'previous_beat'  # [previous peak, peak)
+    LOOKBACK = 'lookback'  # [peak - lookback, peak)
+
+
+_REDUCTIONS = {
+    BeatStatistic.MEAN: np.add,
+    BeatStatistic.MAX: np.maximum,
+    BeatStatistic.MIN: np.minimum,
+}
+
+
+def aggregate_beats(
+    signal: NDArray[np.floating],
+    peaks: NDArray[np.integer],
+    statistic: BeatStatistic = BeatStatistic.MEAN,
+    window: BeatWindow = BeatWindow.PREVIOUS_BEAT,
+    lookback: int = 1,
+) -> FloatArray:
+    """
+    Aggregates the signal in a window of every beat, i.e. every peak but the first, so the result is aligned with HP.
+    Windows end at (exclude) the beat's peak and start at the previous peak or `lookback` samples earlier.
+    Empty windows are NaN.
+    """
+    beat_peaks = peaks[1:]
+    if statistic == BeatStatistic.VALUE:
+        return np.asarray(signal[beat_peaks], dtype=np.float64)
+    starts = peaks[:-1] if window == BeatWindow.PREVIOUS_BEAT else np.maximum(beat_peaks - lookback, 0)
+    return reduce_segments(signal, starts, beat_peaks, statistic)
+
+
+def reduce_segments(
+    signal: NDArray[np.floating],
+    starts: NDArray[np.integer],
+    ends: NDArray[np.integer],
+    statistic: BeatStatistic,
+) -> FloatArray:
+    """
+    Reduces segments [starts[i], ends[i]) of the signal in one segmented reduction (ufunc.reduceat).
+    Segments may overlap. Empty segments are NaN.
+    """
+    if len(ends) == 0:
+        return np.empty(0)
+    if np.max(ends) > len(signal):
+        raise ValueError('Signal is shorter than segments!')
+    if np.max(ends) == len(signal):
+        # reduceat indices must be valid indices, the appended sample is never inside a segment
+        signal = np.append(signal, 0)
+
+    # reduceat reduces between consecutive indices, so with interleaved (start, end) indices
+    # every even position holds the reduction of a segment
+    indices = np.column_stack((starts, ends)).ravel()
+    reduced = _REDUCTIONS[statistic].reduceat(signal, indices)[::2].astype(np.float64)
+    lengths = ends - starts
+    if statistic == BeatStatistic.MEAN:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            reduced /= lengths
+    reduced[lengths <= 0] = np.nan
+    return reduced
@@ -0,0 +1,142 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from typing import cast
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.common.constants import SAMPLING_FREQUENCY
+from src.common.mytypes import FloatArray
+from src.data_process.processors.elgendi import clean_elgendi, fill_missing, find_peaks_elgendi
+
+DEFAULT_MIN_DELAY = 0.3
+DEFAULT_FIND_PEAKS_METHOD = 'elgendi'
+# in-project implementation of the elgendi method, which does not import neurokit2
+NATIVE_FIND_PEAKS_METHOD = 'elgendi_native'
+_CACHE_SIZE = 8
+
+# (signal digest, shape, dtype, sampling rate, method, mindelay)
+type AnnotationKey = tuple[str, tuple[int, ...], str, int, str, float]
+
+
+@dataclass
+class BeatAnnotation:
+    """
+    Beats of a pulsatile signal (e.g. ABP): the cleaned signal, its systolic (upward) peaks,
+    and on first access its diastolic (downward) peaks and beat onsets.
+    Onsets are the diastolic peaks directly preceding a systolic peak.
+    """
+
+    cleaned: FloatArray
+    systolic_peaks: NDArray[np.integer]
+    sampling_rate: int = SAMPLING_FREQUENCY
+    method: str = DEFAULT_FIND_PEAKS_METHOD
+    mindelay: float = DEFAULT_MIN_DELAY
+
+    @cached_property
+    def diastolic_peaks(self) -> NDArray[np.integer]:
+        return find_peaks(
+            self.cleaned * -1, sampling_rate=self.sampling_rate, method=self.method, mindelay=self.mindelay
+        )
+
+    @cached_property
+    def onsets(self) -> NDArray[np.integer]:
+        # index of the last diastolic peak before every systolic peak, -1 if there is none
+        preceding = np.searchsorted(self.diastolic_peaks, self.systolic_peaks) - 1
+        # keep only onsets not shared with the previous systolic peak (no diastolic peak between two systolic ones)
+        is_onset = (preceding >= 0) & np.diff(preceding, prepend=-1).astype(bool)
+        return self.diastolic_peaks[preceding[is_onset]]
+
+
+_cache: OrderedDict[AnnotationKey, BeatAnnotation] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def annotate_beats(
+    signal: NDArray[np.floating],
+    sampling_rate: int = SAMPLING_FREQUENCY,
+    method: str = DEFAULT_FIND_PEAKS_METHOD,
+    mindelay: float = DEFAULT_MIN_DELAY,
+    use_cache: bool = True,
+) -> BeatAnnotation:
+    """
+    Cleans the signal and detects its systolic peaks, once per signal: annotations of the last signals
+    are cached in-process, keyed by a hash of the signal's content, so the same signal (or its copy) is reused.
+    """
+    if not use_cache:
+        return _annotate_beats(signal, sampling_rate, method, mindelay)
+
+    key = _get_key(signal, sampling_rate, method, mindelay)
+    with _cache_lock:
+        if (annotation := _cache.get(key)) is not None:
+            _cache.move_to_end(key)
+            return annotation
+
+    annotation = _annotate_beats(signal, sampling_rate, method, mindelay)
+    with _cache_lock:
+        _cache[key] = annotation
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return annotation
+
+
+def clear_annotation_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def find_peaks(
+    cleaned_signal: NDArray[np.floating],
+    sampling_rate: int = SAMPLING_FREQUENCY,
+    method: str = DEFAULT_FIND_PEAKS_METHOD,
+    mindelay: float = DEFAULT_MIN_DELAY,
+) -> NDArray[np.integer]:
+    if method == NATIVE_FIND_PEAKS_METHOD:
+        return find_peaks_elgendi(cleaned_signal, sampling_rate=sampling_rate, mindelay=mindelay)
+
+    # neurokit2 takes seconds to import, so it is imported only if used
+    import neurokit2 as nk  # noqa: PLC0415
+
+    peaks = nk.ppg_findpeaks(
+        cleaned_signal,
+        sampling_rate=sampling_rate,
+        method=method,
+        mindelay=mindelay,
+    )['PPG_Peaks']
+    return cast(NDArray[np.integer], peaks)
+
+
+def clean_signal(
+    signal: NDArray[np.floating],
+    sampling_rate: int = SAMPLING_FREQUENCY,
+    method: str = DEFAULT_FIND_PEAKS_METHOD,
+) -> FloatArray:
+    """
+    Fills missing samples and filters the signal for peak detection with the method.
+    """
+    if method == NATIVE_FIND_PEAKS_METHOD:
+        return clean_elgendi(fill_missing(signal), sampling_rate=sampling_rate)
+
+    import neurokit2 as nk  # noqa: PLC0415
+
+    filled_signal = nk.signal_fillmissing(signal)
+    return cast(FloatArray, nk.ppg_clean(filled_signal, sampling_rate=sampling_rate, method=method))
+
+
+def _annotate_beats(signal: NDArray[np.floating], sampling_rate: int, method: str, mindelay: float) -> BeatAnnotation:
+    cleaned = clean_signal(signal, sampling_rate=sampling_rate, method=method)
+    return BeatAnnotation(
+        cleaned=cleaned,
+        systolic_peaks=find_peaks(cleaned, sampling_rate=sampling_rate, method=method, mindelay=mindelay),
+        sampling_rate=sampling_rate,
+        method=method,
+        mindelay=mindelay,
+    )
+
+
+def _get_key(signal: NDArray[np.floating], sampling_rate: int, method: str, mindelay: float) -> AnnotationKey:
+    digest = hashlib.blake2b(np.ascontiguousarray(signal).view(np.uint8), digest_size=16).hexdigest()
+    return digest, signal.shape, signal.dtype.str, sampling_rate, method, mindelay
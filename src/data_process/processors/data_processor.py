@@ -1,31 +1,193 @@
+import os
 from abc import ABC, abstractmethod
-from typing import cast
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, cast
 
+from src.common.constants import PROCESSED_DATA_CACHE_DIRECTORY_PATH
 from src.common.logger import logger
-from src.common.mytypes import ArrayDataDict, SubjectData
+from src.common.mytypes import ArrayDataDict, LazySubjectData, SubjectData
+from src.data_process.loaders.data_loader import CBFileError
+from src.data_process.processors.stage_cache import StageCache, get_fingerprint
+
+_TASKS_IN_FLIGHT_PER_WORKER = 2
+_PROCESSED_STAGE = 'processed'
 
 
 class DataProcessor(ABC):
+    def __init__(
+        self,
+        release_raw_data: bool = False,
+        n_workers: int | None = 1,
+        cache_directory: Path | None = PROCESSED_DATA_CACHE_DIRECTORY_PATH,
+    ) -> None:
+        """
+        release_raw_data: release raw arrays of lazily loaded subjects once their condition is processed,
+        so only one condition is held in memory at a time.
+        n_workers: number of processes processing (subject, condition) pairs, None for the number of CPUs,
+        1 processes serially in the current process.
+        cache_directory: directory of processed conditions, addressed by the fingerprint of their raw arrays
+        and the processing parameters, so only changed conditions are processed again. None disables caching.
+        """
+        self.release_raw_data = release_raw_data
+        self.n_workers = n_workers
+        self._cache = StageCache(cache_directory) if cache_directory is not None else None
+
     @abstractmethod
     def _process_single_cb(self, raw_data: ArrayDataDict) -> ArrayDataDict:
         pass
 
+    def get_parameters(self) -> dict[str, Any]:
+        """
+        Parameters of processing that are part of the fingerprints of processed conditions,
+        and identify conditions processed alike in analysis plans.
+        """
+        return {'processor': f'{type(self).__module__}.{type(self).__qualname__}'}
+
     def process_all(self, raw_data: list[SubjectData]) -> list[SubjectData]:
-        processed_data = []
-        for subject_raw_data in raw_data:
-            if processed_subject_data := self.process(subject_raw_data):
-                processed_data.append(processed_subject_data)
-        return processed_data
+        """
+        Processes all subjects, keeping their order. Subjects that fail to process are skipped.
+        """
+        if self.n_workers == 1:
+            processed_data = []
+            for subject_raw_data in raw_data:
+                if processed_subject_data := self.process(subject_raw_data):
+                    processed_data.append(processed_subject_data)
+            return processed_data
+
+        processed = dict(self._iterate_processed_in_parallel(raw_data))
+        return [processed[subject_index] for subject_index in sorted(processed)]
+
+    def iterate_processed(self, raw_data: list[SubjectData]) -> Iterator[SubjectData]:
+        """
+        Yields every subject as soon as all its conditions are processed, for pipelining with the next stages.
+        Subjects come in order of completion, or in order of `raw_data` when processing serially.
+        """
+        if self.n_workers == 1:
+            yield from filter(None, map(self.process, raw_data))
+            return
+        for _, processed_subject_data in self._iterate_processed_in_parallel(raw_data):
+            yield processed_subject_data
 
     def process(self, subject_raw_data: SubjectData) -> SubjectData | None:
         try:
-            return {
-                'id': (subject_raw_data.get('id', 404)),  # type: ignore
-                **{
-                    cb_field_name: self._process_single_cb(cast(ArrayDataDict, cb_raw_data))
-                    for cb_field_name, cb_raw_data in subject_raw_data.items()
-                    if cb_field_name != 'id'
-                },
-            }
+            processed_subject_data: dict[str, int | ArrayDataDict] = {'id': cast(int, subject_raw_data.get('id', 404))}
+            for cb_field_name in subject_raw_data:
+                if cb_field_name == 'id':
+                    continue
+                processed_subject_data[cb_field_name] = self.process_condition(subject_raw_data, cb_field_name)
+            return processed_subject_data
         except ValueError:
             logger.error(f'Missmatching field names for subject: {subject_raw_data["id"]}')
+        except CBFileError as e:
+            logger.warning(f'Failed to load all columns for subject: {subject_raw_data["id"]}\n {e}')
+        except Exception as e:  # noqa: BLE001
+            # same isolation as _get_task_result, e.g. peak detection failing on a flat signal
+            logger.error(f'Unexpected exception for subject: {subject_raw_data.get("id", 404)}\n {e}')
+
+    def process_condition(self, subject_raw_data: SubjectData, cb_field_name: str) -> ArrayDataDict:
+        """
+        Processes a single condition of the subject, or returns it from the cache if it is unchanged.
+        Raises ValueError for missing fields and CBFileError if the condition cannot be loaded.
+        """
+        fingerprint, cb_data = self._load_cached(subject_raw_data, cb_field_name)
+        if cb_data is None:
+            cb_data = self._process_and_cache(cast(ArrayDataDict, subject_raw_data[cb_field_name]), fingerprint)
+        self._release(subject_raw_data, cb_field_name)
+        return cb_data
+
+    def _iterate_processed_in_parallel(self, raw_data: list[SubjectData]) -> Iterator[tuple[int, SubjectData]]:
+        """
+        Processes (subject, condition) pairs on a process pool, yielding (subject index, processed subject).
+        A failing pair skips only its subject. At most a few tasks per worker are submitted at once,
+        so lazily loaded conditions are read only shortly before they are processed.
+        """
+        n_workers = self.n_workers or os.process_cpu_count() or 1
+        tasks = (
+            (subject_index, cb_field_name)
+            for subject_index, subject_raw_data in enumerate(raw_data)
+            for cb_field_name in subject_raw_data
+            if cb_field_name != 'id'
+        )
+        processed: list[dict[str, int | ArrayDataDict]] = [
+            {'id': cast(int, subject_raw_data.get('id', 404))} for subject_raw_data in raw_data
+        ]
+        n_remaining = [len(subject_raw_data) - ('id' in subject_raw_data) for subject_raw_data in raw_data]
+        failed: set[int] = set()
+        yield from ((index, processed[index]) for index, n_conditions in enumerate(n_remaining) if n_conditions == 0)
+
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            pending: dict[Future[ArrayDataDict], tuple[int, str]] = {}
+            while True:
+                for subject_index, cb_field_name in tasks:
+                    if subject_index in failed:
+                        continue
+                    if (future := self._submit(executor, raw_data[subject_index], cb_field_name)) is None:
+                        failed.add(subject_index)
+                        continue
+                    pending[future] = (subject_index, cb_field_name)
+                    if len(pending) >= _TASKS_IN_FLIGHT_PER_WORKER * n_workers:
+                        break
+                if not pending:
+                    return
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    subject_index, cb_field_name = pending.pop(future)
+                    if (cb_data := self._get_task_result(future, processed[subject_index]['id'])) is None:
+                        failed.add(subject_index)
+                        continue
+                    processed[subject_index][cb_field_name] = cb_data
+                    n_remaining[subject_index] -= 1
+                    if n_remaining[subject_index] == 0:
+                        yield subject_index, processed[subject_index]
+
+    def _submit(
+        self, executor: ProcessPoolExecutor, subject_raw_data: SubjectData, cb_field_name: str
+    ) -> Future[ArrayDataDict] | None:
+        try:
+            fingerprint, cb_data = self._load_cached(subject_raw_data, cb_field_name)
+        except CBFileError as e:
+            logger.warning(f'Failed to load all columns for subject: {subject_raw_data["id"]}\n {e}')
+            return None
+        if cb_data is not None:
+            future: Future[ArrayDataDict] = Future()
+            future.set_result(cb_data)
+        else:
+            future = executor.submit(
+                self._process_and_cache, cast(ArrayDataDict, subject_raw_data[cb_field_name]), fingerprint
+            )
+        # the submitted task keeps its own reference to the arrays until they are sent to a worker
+        self._release(subject_raw_data, cb_field_name)
+        return future
+
+    @staticmethod
+    def _get_task_result(future: Future[ArrayDataDict], subject_id: int | ArrayDataDict) -> ArrayDataDict | None:
+        try:
+            return future.result()
+        except ValueError:
+            logger.error(f'Missmatching field names for subject: {subject_id}')
+        except Exception as e:  # noqa: BLE001
+            logger.error(f'Unexpected exception for subject: {subject_id}\n {e}')
+        return None
+
+    def _load_cached(self, subject_raw_data: SubjectData, cb_field_name: str) -> tuple[str, ArrayDataDict | None]:
+        """
+        Fingerprints the raw condition and returns the fingerprint with the cached processed condition, if any.
+        """
+        cb_raw_data = cast(ArrayDataDict, subject_raw_data[cb_field_name])
+        fingerprint = get_fingerprint(cb_raw_data, self.get_parameters())
+        if self._cache is None:
+            return fingerprint, None
+        return fingerprint, self._cache.load(_PROCESSED_STAGE, fingerprint)
+
+    def _process_and_cache(self, raw_data: ArrayDataDict, fingerprint: str) -> ArrayDataDict:
+        processed_data = self._process_single_cb(raw_data)
+        if self._cache is not None:
+            self._cache.save(_PROCESSED_STAGE, fingerprint, processed_data)
+        return processed_data
+
+    def _release(self, subject_raw_data: SubjectData, cb_field_name: str) -> None:
+        if self.release_raw_data and isinstance(subject_raw_data, LazySubjectData):
+            subject_raw_data.release(cb_field_name)
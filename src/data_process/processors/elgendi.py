@@ -0,0 +1,112 @@
+import numpy as np
+import scipy.ndimage
+import scipy.signal
+from numpy.typing import NDArray
+
+from src.common.constants import SAMPLING_FREQUENCY
+from src.common.mytypes import FloatArray
+
+_LOWCUT = 0.5  # Hz
+_HIGHCUT = 8  # Hz
+_FILTER_ORDER = 2
+_PEAK_WINDOW = 0.111  # s
+_BEAT_WINDOW = 0.667  # s
+_BEAT_OFFSET = 0.02
+_MIN_DELAY = 0.3  # s
+
+
+def fill_missing(signal: NDArray[np.floating]) -> FloatArray:
+    """
+    Fills NaNs forward with the last valid sample, and leading NaNs backward with the first valid sample.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    is_valid = ~np.isnan(signal)
+    if is_valid.all() or not is_valid.any():
+        return signal
+    last_valid = np.maximum.accumulate(np.where(is_valid, np.arange(len(signal)), -1))
+    last_valid[last_valid < 0] = np.argmax(is_valid)
+    return signal[last_valid]
+
+
+def get_bandpass_sos(sampling_rate: int = SAMPLING_FREQUENCY) -> FloatArray:
+    """
+    Butterworth bandpass (0.5-8 Hz) of Elgendi et al. (2013) as second-order sections.
+    """
+    return scipy.signal.butter(_FILTER_ORDER, [_LOWCUT, _HIGHCUT], btype='bandpass', output='sos', fs=sampling_rate)
+
+
+def clean_elgendi(signal: NDArray[np.floating], sampling_rate: int = SAMPLING_FREQUENCY) -> FloatArray:
+    """
+    Zero-phase bandpass of Elgendi et al. (2013), as in neurokit2's ppg_clean.
+    """
+    return scipy.signal.sosfiltfilt(get_bandpass_sos(sampling_rate), signal)
+
+
+def find_peaks_elgendi(
+    cleaned_signal: NDArray[np.floating],
+    sampling_rate: int = SAMPLING_FREQUENCY,
+    mindelay: float = _MIN_DELAY,
+    squared_mean: float | None = None,
+) -> NDArray[np.integer]:
+    """
+    Systolic peaks by the two moving averages of Elgendi et al. (2013), on the whole signal at once.
+
+    Waves are spans where the short (peak) moving average of the squared positive signal exceeds
+    the long (beat) one plus an offset, and waves shorter than the peak window are ignored.
+    In every wave the highest local maximum is the peak, where neurokit2 takes the most prominent one;
+    they differ only if the wave starts above the lowest sample after its highest maximum.
+    Peaks closer than `mindelay` to the previous peak (or the signal start) are dropped as in neurokit2.
+
+    squared_mean: mean of the squared positive signal setting the threshold offset, by default of this signal
+        (e.g. of the whole recording when the signal is a part of it).
+    """
+    squared = np.square(np.maximum(cleaned_signal, 0))
+    peak_window = int(np.rint(_PEAK_WINDOW * sampling_rate))
+    ma_peak = scipy.ndimage.uniform_filter1d(squared, peak_window, mode='nearest')
+    ma_beat = scipy.ndimage.uniform_filter1d(squared, int(np.rint(_BEAT_WINDOW * sampling_rate)), mode='nearest')
+    if squared_mean is None:
+        squared_mean = float(np.mean(squared))
+    waves = ma_peak > ma_beat + _BEAT_OFFSET * squared_mean
+
+    starts = np.flatnonzero(~waves[:-1] & waves[1:])
+    ends = np.flatnonzero(waves[:-1] & ~waves[1:])
+    if len(starts) == 0:
+        return np.empty(0, dtype=np.int64)
+    ends = ends[ends > starts[0]]
+    n_waves = min(len(starts), len(ends))
+    starts, ends = starts[:n_waves], ends[:n_waves]
+    is_long = ends - starts >= peak_window
+    starts, ends = starts[is_long], ends[is_long]
+
+    # local maxima strictly inside a wave (scipy's find_peaks: rising edge, then a falling edge after a plateau)
+    candidates = _get_local_maxima(cleaned_signal)
+    wave_index = np.searchsorted(starts, candidates, side='right') - 1
+    in_wave = (wave_index >= 0) & (candidates > starts[np.maximum(wave_index, 0)])
+    in_wave &= candidates < ends[np.maximum(wave_index, 0)] - 1
+    candidates, wave_index = candidates[in_wave], wave_index[in_wave]
+    if len(candidates) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # highest candidate of every wave: sort by wave, then by height descending, and take the first per wave
+    order = np.lexsort((-cleaned_signal[candidates], wave_index))
+    first_in_wave = np.flatnonzero(np.diff(wave_index[order], prepend=-1) != 0)
+    peaks = candidates[order[first_in_wave]]
+    return _enforce_min_delay(peaks, int(np.rint(mindelay * sampling_rate)))
+
+
+def _get_local_maxima(signal: NDArray[np.floating]) -> NDArray[np.integer]:
+    # same convention as scipy.signal.find_peaks: the middle (rounded down) of a plateau is the maximum
+    maxima, _ = scipy.signal.find_peaks(signal)
+    return maxima
+
+
+def _enforce_min_delay(peaks: NDArray[np.integer], min_delay: int) -> NDArray[np.integer]:
+    gaps = np.diff(peaks, prepend=0)
+    if np.all(gaps > min_delay):
+        return peaks
+    # a dropped peak does not count as previous peak, so conflicts are resolved sequentially
+    accepted = [0]
+    for peak in peaks:
+        if peak - accepted[-1] > min_delay:
+            accepted.append(int(peak))
+    return np.array(accepted[1:], dtype=np.int64)
@@ -0,0 +1,155 @@
+import numpy as np
+import scipy.signal
+from numpy.typing import NDArray
+
+from src.common.constants import SAMPLING_FREQUENCY
+from src.common.mytypes import ArrayDataDict, FloatArray
+from src.data_process.processors.beat_annotation import DEFAULT_MIN_DELAY
+from src.data_process.processors.elgendi import fill_missing, find_peaks_elgendi, get_bandpass_sos
+from src.data_process.processors.utils import adjust_etco2, get_hp, get_sap
+
+_DEFAULT_WINDOW_SECONDS = 10.0
+_DEFAULT_MARGIN_SECONDS = 4.0
+_DEFAULT_UPDATE_SECONDS = 0.5
+
+
+class RealtimeBaroreflexProcessor:
+    """
+    Incremental counterpart of BaroreflexDataProcessor for samples arriving in blocks at `sampling_rate`:
+    emits SAP, HP and ETCO2 of beats as soon as they are final.
+
+    The forward pass of the zero-phase bandpass keeps its state across blocks, and the backward pass
+    runs over the last `window_seconds` only, starting from the newest sample. Peaks are detected with
+    the native Elgendi detector on that window every `update_seconds` and are final once they are
+    `margin_seconds` old, where the backward pass has settled. A beat is thus emitted at most
+    margin + update seconds (plus the block length) after its peak, and memory is bounded by the window.
+
+    The threshold offset uses the mean over all samples so far instead of the whole recording,
+    and the filter starts in steady state instead of neurokit2's padding, so beats can differ from
+    the batch results (get_peaks, get_sap, get_hp, adjust_etco2) near the start of the recording.
+    Later beats cannot be guaranteed equal either, since the backward pass of the batch filter depends on
+    the whole rest of the recording: a peak whose two highest samples are nearly equal can move by 1 sample
+    (5 ms of HP, and SAP and ETCO2 of that beat). With the default 4 s margin no peak moved on 12 simulated
+    600 s recordings pushed in random blocks, against 6 with a 3 s margin. See `benchmark_streaming`.
+    """
+
+    def __init__(
+        self,
+        sampling_rate: int = SAMPLING_FREQUENCY,
+        window_seconds: float = _DEFAULT_WINDOW_SECONDS,
+        margin_seconds: float = _DEFAULT_MARGIN_SECONDS,
+        update_seconds: float = _DEFAULT_UPDATE_SECONDS,
+        mindelay: float = DEFAULT_MIN_DELAY,
+    ) -> None:
+        if window_seconds <= margin_seconds + update_seconds:
+            raise ValueError('Window must be longer than margin and update interval together')
+        self.sampling_rate = sampling_rate
+        self.mindelay = mindelay
+        self._window = int(window_seconds * sampling_rate)
+        self._margin = int(margin_seconds * sampling_rate)
+        self._update = int(update_seconds * sampling_rate)
+        self._sos = get_bandpass_sos(sampling_rate)
+        self._zi: FloatArray | None = None
+        self._last_valid_abp = np.nan
+
+        # buffers of the last samples, starting at absolute index `_offset`
+        self._abp: FloatArray = np.empty(0)
+        self._etco2: FloatArray = np.empty(0)
+        self._forward: FloatArray = np.empty(0)
+        self._offset = 0
+        self._n_pending = 0
+
+        self._committed_until = 0
+        self._previous_peak: int | None = None
+        self._squared_sum = 0.0
+        self._n_squared = 0
+
+    def push(self, abp: NDArray[np.floating], etco2: NDArray[np.floating]) -> ArrayDataDict:
+        """
+        Adds a block of samples and returns beat values finalized since the last call (possibly none).
+        """
+        if len(abp) != len(etco2):
+            raise ValueError('time series entries need to have same length')
+        if len(abp) == 0:
+            return self._get_beats(np.empty(0, dtype=np.int64))
+        abp = np.asarray(abp, dtype=np.float64)
+        etco2 = np.asarray(etco2, dtype=np.float64)
+
+        filled_abp = self._fill_missing(abp)
+        if self._zi is None:
+            self._zi = scipy.signal.sosfilt_zi(self._sos) * filled_abp[0]
+        forward, self._zi = scipy.signal.sosfilt(self._sos, filled_abp, zi=self._zi)
+
+        self._abp = np.concatenate((self._abp, abp))
+        self._etco2 = np.concatenate((self._etco2, etco2))
+        self._forward = np.concatenate((self._forward, forward))
+        self._n_pending += len(abp)
+        if self._n_pending < self._update:
+            return self._get_beats(np.empty(0, dtype=np.int64))
+        return self._detect(is_final=False)
+
+    def flush(self) -> ArrayDataDict:
+        """
+        Finalizes all remaining beats at the end of the recording.
+        """
+        if len(self._forward) == 0:
+            return self._get_beats(np.empty(0, dtype=np.int64))
+        return self._detect(is_final=True)
+
+    def _detect(self, is_final: bool) -> ArrayDataDict:
+        backward_zi = scipy.signal.sosfilt_zi(self._sos) * self._forward[-1]
+        cleaned, _ = scipy.signal.sosfilt(self._sos, self._forward[::-1], zi=backward_zi)
+        cleaned = cleaned[::-1]
+
+        end = self._offset + len(cleaned)
+        commit_end = end if is_final else max(end - self._margin, self._committed_until)
+        squared = np.square(np.maximum(cleaned[self._committed_until - self._offset :], 0))
+        squared_mean = (self._squared_sum + np.sum(squared)) / (self._n_squared + len(squared))
+
+        peaks = find_peaks_elgendi(cleaned, self.sampling_rate, self.mindelay, squared_mean=squared_mean) + self._offset
+        peaks = peaks[(peaks >= self._committed_until) & (peaks < commit_end)]
+        if self._previous_peak is not None:
+            peaks = peaks[peaks >= self._previous_peak + int(self.mindelay * self.sampling_rate)]
+        beats = self._get_beats(peaks)
+
+        # only samples that are final contribute to the threshold of later windows
+        self._squared_sum += float(np.sum(squared[: commit_end - self._committed_until]))
+        self._n_squared += commit_end - self._committed_until
+        self._committed_until = commit_end
+        self._n_pending = 0
+        self._trim()
+        return beats
+
+    def _get_beats(self, peaks: NDArray[np.integer]) -> ArrayDataDict:
+        if self._previous_peak is not None:
+            peaks = np.concatenate(([self._previous_peak], peaks)).astype(np.int64)
+        if len(peaks) < 2:
+            if len(peaks):
+                self._previous_peak = int(peaks[-1])
+            return {'sap': np.empty(0), 'hp': np.empty(0), 'etco2': np.empty(0)}
+
+        # the previous peak can lie before the buffers, its position is then only used for HP
+        local_peaks = np.maximum(peaks - self._offset, 0)
+        self._previous_peak = int(peaks[-1])
+        return {
+            'sap': get_sap(self._abp, local_peaks),
+            'hp': get_hp(peaks, self.sampling_rate),
+            'etco2': adjust_etco2(self._etco2, local_peaks),
+        }
+
+    def _fill_missing(self, abp: FloatArray) -> FloatArray:
+        # forward fill continues from the last valid sample of previous blocks
+        if np.isnan(self._last_valid_abp):
+            filled = fill_missing(abp)
+        else:
+            filled = fill_missing(np.concatenate(([self._last_valid_abp], abp)))[1:]
+        if not np.isnan(filled[-1]):
+            self._last_valid_abp = float(filled[-1])
+        return filled
+
+    def _trim(self) -> None:
+        n_dropped = max(len(self._forward) - self._window, 0)
+        self._abp = self._abp[n_dropped:]
+        self._etco2 = self._etco2[n_dropped:]
+        self._forward = self._forward[n_dropped:]
+        self._offset += n_dropped
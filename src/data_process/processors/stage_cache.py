@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+from functools import cache
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+
+from src.common.logger import logger
+from src.common.mytypes import ArrayDataDict
+
+_PROCESSORS_PACKAGE_DIRECTORY = Path(__file__).parent
+
+
+class StageCache:
+    """
+    Cache of outputs of pipeline stages, e.g. the beat series of a condition, one .npz file per entry.
+
+    Entries are addressed by the fingerprint of the stage's inputs and parameters (see `get_fingerprint`),
+    so changed inputs or parameters address new entries and only the affected stages recompute.
+    Entries are written atomically, so concurrent writers and interrupted writes never leave partial entries.
+    """
+
+    def __init__(self, cache_directory: Path) -> None:
+        self.cache_directory = cache_directory
+
+    def load(self, stage: str, fingerprint: str) -> ArrayDataDict | None:
+        entry_path = self._get_entry_path(stage, fingerprint)
+        if not entry_path.exists():
+            return None
+        try:
+            with np.load(entry_path) as entry:
+                return {name: entry[name] for name in entry.files}
+        except (OSError, ValueError) as e:
+            logger.warning(f'Failed to read {stage} stage cache entry {fingerprint}\n {e}')
+            return None
+
+    def save(self, stage: str, fingerprint: str, data: ArrayDataDict) -> None:
+        entry_path = self._get_entry_path(stage, fingerprint)
+        temporary_path = entry_path.with_suffix(f'.{os.getpid()}.tmp.npz')
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(temporary_path, **cast(dict[str, Any], data))
+            temporary_path.replace(entry_path)
+        except OSError as e:
+            logger.warning(f'Failed to cache {stage} stage entry {fingerprint}\n {e}')
+
+    def _get_entry_path(self, stage: str, fingerprint: str) -> Path:
+        return self.cache_directory / stage / f'{fingerprint}.npz'
+
+
+def get_fingerprint(inputs: ArrayDataDict, parameters: dict[str, Any]) -> str:
+    """
+    Digest of the input arrays (names, dtypes, shapes and contents), the parameters (JSON serializable)
+    and the version of the processors package code.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps({**parameters, 'code_version': get_code_version()}, sort_keys=True).encode())
+    for name in sorted(inputs):
+        array = np.ascontiguousarray(inputs[name])
+        digest.update(f'{name}:{array.dtype.str}{array.shape}'.encode())
+        digest.update(array.view(np.uint8))
+    return digest.hexdigest()
+
+
+@cache
+def get_code_version() -> str:
+    """
+    Digest of the source files of the processors package.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for source_path in sorted(_PROCESSORS_PACKAGE_DIRECTORY.glob('*.py')):
+        digest.update(source_path.name.encode())
+        digest.update(source_path.read_bytes())
+    return digest.hexdigest()
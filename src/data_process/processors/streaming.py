@@ -0,0 +1,92 @@
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.common.constants import SAMPLING_FREQUENCY
+from src.common.mytypes import ArrayDataDict
+from src.data_process.processors.beat_annotation import DEFAULT_MIN_DELAY, annotate_beats
+
+_DEFAULT_OVERLAP_SECONDS = 10.0
+_DEFAULT_MARGIN_SECONDS = 4.0
+
+
+@dataclass
+class PeaksBlock:
+    """
+    Peaks detected in a chunk of a stream.
+
+    signals: samples of the chunk preceded by the overlap with previous chunks, starting at absolute index `offset`.
+    peaks: absolute indices of the new peaks, preceded by the last peak of the previous block (if there was one),
+        so beat series computed from them skipping the first peak continue the previous block seamlessly.
+    """
+
+    signals: ArrayDataDict
+    offset: int
+    peaks: NDArray[np.integer]
+
+    @property
+    def local_peaks(self) -> NDArray[np.integer]:
+        # the previous peak can lie before the overlap, its position is then only valid in `peaks`
+        return np.maximum(self.peaks - self.offset, 0)
+
+
+def stream_peaks(
+    chunks: Iterable[ArrayDataDict],
+    reference_field: str,
+    sampling_rate: int = SAMPLING_FREQUENCY,
+    overlap_seconds: float = _DEFAULT_OVERLAP_SECONDS,
+    margin_seconds: float = _DEFAULT_MARGIN_SECONDS,
+    mindelay: float = DEFAULT_MIN_DELAY,
+) -> Iterator[PeaksBlock]:
+    """
+    Detects upward peaks of the reference signal chunk by chunk, holding at most one chunk plus the overlap.
+
+    Each chunk is prepended with the last `overlap_seconds` of the stream, so filtering is not affected by the
+    chunk's start. Peaks within the last `margin_seconds` are deferred to the next chunk, where they are hardly
+    affected by its end, and a peak detected on both sides of the boundary (within `mindelay`) is kept once.
+
+    Peaks cannot be guaranteed equal to annotate_beats on the whole signal: the zero-phase filter of every chunk
+    ends at its last sample, and the detection threshold is chunk-wise. A peak whose two highest samples are
+    nearly equal can thus move by 1 sample (5 ms of HP). With the default 4 s margin no peak moved on
+    12 simulated 600 s recordings in fixed and random chunks, against 3 with a 2 s margin. See `benchmark_streaming`.
+    """
+    overlap = int(overlap_seconds * sampling_rate)
+    margin = int(margin_seconds * sampling_rate)
+    if overlap <= margin:
+        raise ValueError(f'Overlap ({overlap_seconds}s) must be longer than margin ({margin_seconds}s)')
+    min_distance = int(mindelay * sampling_rate)
+
+    history: ArrayDataDict | None = None
+    offset = 0
+    committed_until = 0
+    previous_peak: int | None = None
+    chunks_iterator = iter(chunks)
+    chunk = next(chunks_iterator, None)
+    while chunk is not None:
+        next_chunk = next(chunks_iterator, None)
+        is_last = next_chunk is None
+
+        signals = chunk if history is None else {name: np.concatenate((history[name], chunk[name])) for name in chunk}
+        end = offset + len(signals[reference_field])
+        commit_end = end if is_last else max(end - margin, committed_until)
+
+        # chunks are never seen again, so they are not cached
+        annotation = annotate_beats(signals[reference_field], sampling_rate, mindelay=mindelay, use_cache=False)
+        peaks = annotation.systolic_peaks + offset
+        peaks = peaks[(peaks >= committed_until) & (peaks < commit_end)]
+        if previous_peak is not None:
+            peaks = peaks[peaks >= previous_peak + min_distance]
+        if len(peaks):
+            previous_peaks = [previous_peak] if previous_peak is not None else []
+            yield PeaksBlock(
+                signals=signals, offset=offset, peaks=np.concatenate((previous_peaks, peaks)).astype(np.int64)
+            )
+            previous_peak = int(peaks[-1])
+
+        committed_until = commit_end
+        kept = min(overlap, len(signals[reference_field]))
+        history = {name: signal[-kept:] for name, signal in signals.items()}
+        offset = end - kept
+        chunk = next_chunk
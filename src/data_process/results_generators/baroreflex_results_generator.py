@@ -1,12 +1,26 @@
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
 from src.common.logger import logger
 from src.common.mytypes import SubjectData
-from src.data_process.entropy import cjte_dv, cte_dv, jte_dv, te_dv
+from src.data_process.entropy import EstimateCache, cjte_dv, cte_dv, jte_dv, pid_dv, te_dv, te_multiscale
+from src.data_process.entropy.estimate_cache import Estimator
 from src.data_process.results_generators.result_generator import ResultsGenerator
 
 
 class BaroreflexResultsGenerator(ResultsGenerator):
-    def __init__(self, processed_data: list[SubjectData]) -> None:
-        super().__init__(processed_data)
+    def __init__(
+        self,
+        processed_data: Sequence[SubjectData],
+        checkpoint_path: Path | None = None,
+        estimate_cache: EstimateCache | None = None,
+    ) -> None:
+        """
+        estimate_cache: cache of TE and CJTE estimates shared between runs, None computes all estimates.
+        """
+        super().__init__(processed_data, checkpoint_path=checkpoint_path)
+        self.estimate_cache = estimate_cache
 
     def add_te(
         self,
@@ -14,7 +28,7 @@ class BaroreflexResultsGenerator(ResultsGenerator):
         y_name: str,
     ) -> str:
         field_name = f'te_{y_name}->{x_name}'
-        for subject_id, cb_data_type, cb_data in self.iterate_cb_data():
+        for subject_id, cb_data_type, cb_data in self.iterate_cb_data(skip_done=[field_name]):
             x, y = (self._get_signal(cb_data, sig_name, cb_data_type, subject_id) for sig_name in [x_name, y_name])
             try:
                 if x is not None and y is not None:
@@ -22,7 +36,7 @@ class BaroreflexResultsGenerator(ResultsGenerator):
                         condition=cb_data_type,
                         subject_id=subject_id,
                         field_name=field_name,
-                        value=te_dv(x, y),
+                        value=self._estimate(te_dv, x, y),
                     )
             except ValueError as e:
                 logger.error(f'TE calculation error for P{subject_id} {cb_data_type} {e}')
@@ -36,7 +50,7 @@ class BaroreflexResultsGenerator(ResultsGenerator):
 
     def add_cjte(self, x_name: str, y_name: str, z_name: str, w_name: str) -> str:
         field_name = f'cjte_({x_name},{y_name})->{z_name}|{w_name}'
-        for subject_id, cb_data_type, cb_data in self.iterate_cb_data():
+        for subject_id, cb_data_type, cb_data in self.iterate_cb_data(skip_done=[field_name]):
             x, y, z, w = (
                 self._get_signal(cb_data, sig_name, cb_data_type, subject_id)
                 for sig_name in [x_name, y_name, z_name, w_name]
@@ -48,7 +62,7 @@ class BaroreflexResultsGenerator(ResultsGenerator):
                         condition=cb_data_type,
                         subject_id=subject_id,
                         field_name=field_name,
-                        value=cjte_dv(x, y, z, w),
+                        value=self._estimate(cjte_dv, x, y, z, w),
                     )
                 except ValueError as e:
                     logger.error(f'CJTE calculation error for P{subject_id} {cb_data_type} {e}')
@@ -59,3 +73,58 @@ class BaroreflexResultsGenerator(ResultsGenerator):
                         value=None,
                     )
         return field_name
+
+    def add_pid(self, x_name: str, y_name: str, z_name: str) -> list[str]:
+        """
+        Adds redundant, unique and synergistic parts of JTE_{(X,Y)->Z}, computed from one shared partitioning.
+        """
+        sources = f'({x_name},{y_name})->{z_name}'
+        field_names = [f'pid_{part}_{sources}' for part in ['red', f'unq_{x_name}', f'unq_{y_name}', 'syn']]
+        for subject_id, cb_data_type, cb_data in self.iterate_cb_data(skip_done=field_names):
+            x, y, z = (
+                self._get_signal(cb_data, sig_name, cb_data_type, subject_id) for sig_name in [x_name, y_name, z_name]
+            )
+            if x is not None and y is not None and z is not None:
+                values: list[float | None]
+                try:
+                    pid = pid_dv(x, y, z)
+                    values = [pid.redundancy, pid.unique_x, pid.unique_y, pid.synergy]
+                except ValueError as e:
+                    logger.error(f'PID calculation error for P{subject_id} {cb_data_type} {e}')
+                    values = [None] * len(field_names)
+                for field_name, value in zip(field_names, values, strict=True):
+                    self._add_result(
+                        condition=cb_data_type,
+                        subject_id=subject_id,
+                        field_name=field_name,
+                        value=value,
+                    )
+        return field_names
+
+    def add_te_multiscale(self, x_name: str, y_name: str, scales: Sequence[int]) -> list[str]:
+        """
+        Adds the TE_{Y->X} vs scale curve of coarse-grained signals, as one field per scale.
+        """
+        field_names = {scale: f'te_{y_name}->{x_name}_scale={scale}' for scale in scales}
+        for subject_id, cb_data_type, cb_data in self.iterate_cb_data(skip_done=list(field_names.values())):
+            x, y = (self._get_signal(cb_data, sig_name, cb_data_type, subject_id) for sig_name in [x_name, y_name])
+            if x is not None and y is not None:
+                values: dict[int, float | None]
+                try:
+                    values = te_multiscale(x, y, scales)
+                except ValueError as e:
+                    logger.error(f'Multiscale TE calculation error for P{subject_id} {cb_data_type} {e}')
+                    values = dict.fromkeys(scales)
+                for scale, value in values.items():
+                    self._add_result(
+                        condition=cb_data_type,
+                        subject_id=subject_id,
+                        field_name=field_names[scale],
+                        value=value,
+                    )
+        return list(field_names.values())
+
+    def _estimate(self, estimator: Estimator, *args: Any) -> float:
+        if self.estimate_cache is None:
+            return estimator(*args)
+        return self.estimate_cache.estimate(estimator, *args)
@@ -0,0 +1,76 @@
+import json
+import math
+import os
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from src.common.logger import logger
+
+_DEFAULT_FLUSH_INTERVAL_SECONDS = 10.0
+
+# (condition, pid, field name, value, fingerprint of the data it was estimated from or None)
+type ResultRecord = tuple[str, int, str, float | None, str | None]
+
+
+class ResultCheckpoint:
+    """
+    Append-only JSON lines file of completed results, one record per line.
+
+    Records are buffered and appended at most every `flush_interval` seconds (and on flush) with a single
+    write followed by fsync, so a crash loses at most the last interval. A line cut off by a crash is
+    dropped when the checkpoint is read again, and the file is truncated to its last complete line.
+    Records may carry a fingerprint of the data they were estimated from, so results of changed data
+    are not restored.
+    """
+
+    def __init__(self, path: Path, flush_interval: float = _DEFAULT_FLUSH_INTERVAL_SECONDS) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self._buffer: list[str] = []
+        self._last_flush = time.monotonic()
+
+    def load(self) -> Iterator[ResultRecord]:
+        if not self.path.exists():
+            return
+        content = self.path.read_bytes()
+        complete_length = content.rfind(b'\n') + 1
+        if complete_length < len(content):
+            logger.warning(f'Dropping incomplete last record of checkpoint {self.path}')
+            with open(self.path, 'r+b') as f:
+                f.truncate(complete_length)
+        for line in content[:complete_length].decode('utf-8').splitlines():
+            record = json.loads(line)
+            yield record['condition'], record['pid'], record['field'], record['value'], record.get('fingerprint')
+
+    def append(
+        self, condition: str, subject_id: int, field_name: str, value: float | None, fingerprint: str | None = None
+    ) -> None:
+        if value is not None and not math.isfinite(value):
+            value = None
+        record = {'condition': condition, 'pid': subject_id, 'field': field_name, 'value': value}
+        if fingerprint is not None:
+            record['fingerprint'] = fingerprint
+        self._buffer.append(json.dumps(record) + '\n')
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, ''.join(self._buffer).encode('utf-8'))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._buffer.clear()
+
+    def discard(self) -> None:
+        """
+        Deletes the checkpoint, e.g. once its results are saved elsewhere.
+        """
+        self._buffer.clear()
+        self.path.unlink(missing_ok=True)
@@ -1,48 +1,66 @@
-import csv
-from collections import defaultdict
-from collections.abc import Generator
+from collections.abc import Generator, Sequence
 from pathlib import Path
 from typing import cast
 
 import numpy as np
+import pandas as pd
 
-from src.common.constants import CONDITION_FIELD, ID_FIELD
 from src.common.logger import logger
 from src.common.mytypes import ArrayDataDict, FloatArray, SubjectData
+from src.data_process.results_generators.checkpoint import ResultCheckpoint
+from src.data_process.results_generators.result_table import ResultTable
 
 
 class ResultsGenerator:
-    def __init__(self, processed_data: list[SubjectData]) -> None:
+    def __init__(self, processed_data: Sequence[SubjectData], checkpoint_path: Path | None = None) -> None:
+        """
+        checkpoint_path: append-only file of completed results. Results found in it are restored and
+        not computed again, so an interrupted run resumes where it stopped. It is removed once the results
+        are exported, so a complete run is not restored by later runs, e.g. of changed data.
+        """
         self.processed_data = processed_data
-        self._results: dict[str, dict[int, dict[str, float | None]]] = defaultdict(
-            lambda: defaultdict(lambda: defaultdict(float))
-        )
-        self._fieldnames: list[str] = [ID_FIELD, CONDITION_FIELD]
+        self._results = ResultTable()
+        self._checkpoint = ResultCheckpoint(checkpoint_path) if checkpoint_path is not None else None
+        if self._checkpoint is not None:
+            for condition, subject_id, field_name, value, _ in self._checkpoint.load():
+                self._results.set(condition, subject_id, field_name, value)
+            if len(self._results):
+                logger.info(f'Restored results of {len(self._results)} subject conditions from {checkpoint_path}')
 
     def generate_results_csv(self, file_path: str) -> None:
         if not file_path.endswith('.csv'):
             file_path += '.csv'
+        self.export_results(file_path)
+
+    def export_results(self, file_path: str | Path) -> None:
+        """
+        Saves the results as CSV, Parquet or Feather, depending on the file extension.
+        """
+        self.flush_checkpoint()
         if Path(file_path).exists():
             logger.warning(f'Overwritting file: {file_path}!')
-            # file_path = file_path.split('.')[0] + '(1).csv'
 
         try:
-            with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=self._fieldnames)
-                writer.writeheader()
-
-                for cb_type, pid_dict in self._results.items():
-                    for pid, metrics in pid_dict.items():
-                        row = {ID_FIELD: pid, CONDITION_FIELD: cb_type}
-                        row.update(metrics)
-                        writer.writerow(row)
+            self._results.export(file_path)
         except Exception as e:
-            logger.error('Unexpected Exception while saving to csv')
+            logger.error(f'Unexpected Exception while saving to {file_path}')
             raise e
         else:
             logger.info(f'Sucesfully saved results to {file_path}')
+            if self._checkpoint is not None:
+                self._checkpoint.discard()
+
+    def flush_checkpoint(self) -> None:
+        if self._checkpoint is not None:
+            self._checkpoint.flush()
 
-    def add_means(self, patinets_data: list[SubjectData]) -> None:
+    def get_results(self) -> pd.DataFrame:
+        """
+        Returns the results as a DataFrame, e.g. for StatisticsAnalyzer.
+        """
+        return self._results.to_dataframe()
+
+    def add_means(self, patinets_data: Sequence[SubjectData]) -> None:
         for subject_id, cb_data_type, cb_data in self.iterate_cb_data(patinets_data):
             for field_name, field_value in cast(ArrayDataDict, cb_data).items():
                 self._add_result(
@@ -53,17 +71,21 @@ class ResultsGenerator:
                 )
 
     def iterate_cb_data(
-        self, processed_data: list[SubjectData] | None = None
+        self, processed_data: Sequence[SubjectData] | None = None, skip_done: list[str] | None = None
     ) -> Generator[tuple[int, str, ArrayDataDict]]:
+        """
+        skip_done: fields of the results; conditions where all of them are already done are skipped without loading.
+        """
         if processed_data is None:
             processed_data = self.processed_data
         for subject_data in processed_data:
             subject_id = self._get_subject_id(subject_data)
             if subject_id is None:
                 continue
-            for cb_data_type, cb_data in subject_data.items():
-                if cb_data_type != 'id':
-                    yield subject_id, cb_data_type, cast(ArrayDataDict, cb_data)
+            for cb_data_type in subject_data:
+                if cb_data_type == 'id' or (skip_done and self._is_done(cb_data_type, subject_id, skip_done)):
+                    continue
+                yield subject_id, cb_data_type, cast(ArrayDataDict, subject_data[cb_data_type])
 
     @staticmethod
     def _get_subject_id(subject_data: SubjectData) -> int | None:
@@ -74,9 +96,12 @@ class ResultsGenerator:
         return subject_id
 
     def _add_result(self, condition: str, subject_id: int, field_name: str, value: float | None) -> None:
-        self._results[condition][subject_id][field_name] = value
-        if field_name not in self._fieldnames:
-            self._fieldnames.append(field_name)
+        self._results.set(condition, subject_id, field_name, value)
+        if self._checkpoint is not None:
+            self._checkpoint.append(condition, subject_id, field_name, value)
+
+    def _is_done(self, condition: str, subject_id: int, field_names: list[str]) -> bool:
+        return all(self._results.contains(condition, subject_id, field_name) for field_name in field_names)
 
     def _get_signal(self, cb_data: ArrayDataDict, name: str, cb_data_type: str, pid: int) -> FloatArray | None:
         signal = cb_data.get(name)
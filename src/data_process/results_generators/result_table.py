@@ -0,0 +1,116 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+
+from src.common.constants import CONDITION_FIELD, ID_FIELD
+from src.common.mytypes import FloatArray
+
+_INITIAL_CAPACITY = 64
+_EXPORT_FORMATS = ('.csv', '.parquet', '.feather')
+
+
+class ResultTable:
+    """
+    Columnar store of results: one row per (condition, pid) and one float64 column per field,
+    with a mask of the values that were set. Missing and None values are NaN.
+
+    Rows are appended in order of first use and the arrays grow by doubling their capacity,
+    so adding a value costs amortized O(1) regardless of the number of rows and fields.
+    """
+
+    def __init__(self) -> None:
+        self._rows: dict[tuple[str, int], int] = {}
+        self._conditions: dict[str, int] = {}
+        self._capacity = _INITIAL_CAPACITY
+        self._pids: NDArray[np.int64] = np.empty(self._capacity, dtype=np.int64)
+        self._condition_codes: NDArray[np.int32] = np.empty(self._capacity, dtype=np.int32)
+        self._columns: dict[str, FloatArray] = {}
+        self._is_set: dict[str, NDArray[np.bool_]] = {}
+
+    @property
+    def fieldnames(self) -> list[str]:
+        return [ID_FIELD, CONDITION_FIELD, *self._columns]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def set(self, condition: str, subject_id: int, field_name: str, value: float | None) -> None:
+        row = self._get_row(condition, subject_id)
+        if field_name not in self._columns:
+            self._columns[field_name] = np.full(self._capacity, np.nan)
+            self._is_set[field_name] = np.zeros(self._capacity, dtype=np.bool_)
+        self._columns[field_name][row] = np.nan if value is None else value
+        self._is_set[field_name][row] = True
+
+    def get(self, condition: str, subject_id: int, field_name: str) -> float | None:
+        """
+        Returns the value, None if it is missing or was set to None.
+        """
+        row = self._rows.get((condition, subject_id))
+        if row is None or field_name not in self._columns or np.isnan(value := self._columns[field_name][row]):
+            return None
+        return float(value)
+
+    def contains(self, condition: str, subject_id: int, field_name: str) -> bool:
+        """
+        Whether the value was set, including values set to None.
+        """
+        row = self._rows.get((condition, subject_id))
+        return row is not None and field_name in self._is_set and bool(self._is_set[field_name][row])
+
+    def iterate_rows(self) -> Iterator[tuple[str, int]]:
+        return iter(self._rows)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the results with columns pid, cb_type and the fields, ordered by condition, then by row.
+        """
+        n_rows = len(self._rows)
+        order = np.argsort(self._condition_codes[:n_rows], kind='stable')
+        conditions = np.array(list(self._conditions), dtype=object)
+        return pd.DataFrame(
+            {
+                ID_FIELD: self._pids[order],
+                CONDITION_FIELD: conditions[self._condition_codes[order]] if n_rows else np.empty(0, dtype=object),
+                **{field_name: column[order] for field_name, column in self._columns.items()},
+            }
+        )
+
+    def export(self, file_path: str | Path) -> None:
+        """
+        Writes the results as CSV, Parquet or Feather, depending on the file extension.
+        Parquet and Feather require pyarrow.
+        """
+        suffix = Path(file_path).suffix
+        data = self.to_dataframe()
+        if suffix == '.csv':
+            # same line endings as csv.writer
+            data.to_csv(file_path, index=False, encoding='utf-8', lineterminator='\r\n')
+        elif suffix == '.parquet':
+            data.to_parquet(file_path, index=False)
+        elif suffix == '.feather':
+            data.to_feather(file_path)
+        else:
+            raise ValueError(f'Unsupported results file format {suffix}, expected one of {_EXPORT_FORMATS}')
+
+    def _get_row(self, condition: str, subject_id: int) -> int:
+        if (row := self._rows.get((condition, subject_id))) is not None:
+            return row
+        row = len(self._rows)
+        if row == self._capacity:
+            self._grow()
+        self._rows[condition, subject_id] = row
+        self._pids[row] = subject_id
+        self._condition_codes[row] = self._conditions.setdefault(condition, len(self._conditions))
+        return row
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        self._pids = np.resize(self._pids, self._capacity)
+        self._condition_codes = np.resize(self._condition_codes, self._capacity)
+        for field_name, column in self._columns.items():
+            self._columns[field_name] = np.concatenate((column, np.full(len(column), np.nan)))
+            self._is_set[field_name] = np.concatenate((self._is_set[field_name], np.zeros(len(column), np.bool_)))
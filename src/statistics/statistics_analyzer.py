@@ -13,13 +13,16 @@ _P_ADJUST = 'bonf'
 
 
 class StatisticsAnalyzer:
-    def __init__(self, csv_file_path: str | Path, order: list[str] | None = None) -> None:
+    def __init__(self, results: str | Path | pd.DataFrame, order: list[str] | None = None) -> None:
+        """
+        results: path of a results CSV file, or the results DataFrame of a ResultsGenerator.
+        """
         self.categories: list[str] = []
-        self.data = self._load_data(csv_file_path, order)
+        self.data = self._load_data(results, order)
         self._remove_subjects_with_nans()
 
-    def _load_data(self, csv_file_path: str | Path, order: list[str] | None) -> pd.DataFrame:
-        data = pd.read_csv(csv_file_path)
+    def _load_data(self, results: str | Path | pd.DataFrame, order: list[str] | None) -> pd.DataFrame:
+        data = results.copy() if isinstance(results, pd.DataFrame) else pd.read_csv(results)
         self.categories = list(data[CONDITION_FIELD].unique()) if order is None else order
         data[CONDITION_FIELD] = pd.Categorical(data[CONDITION_FIELD], categories=self.categories, ordered=True)
         return data
@@ -8,6 +8,14 @@ from src.synthetic.generate_linear_trivariate import (
     LINEAR_TRIVARIATE_DATA_Z,
 )
 from src.synthetic.generate_nonlinear_openloop import NONLINEAR_CLOSEDLOOP_DATA
+from src.synthetic.generate_stress import (
+    STRESS_CHAIN_STATE_MATRICES,
+    STRESS_LINEAR_BIVARIATE_DATA_L,
+    STRESS_LINEAR_BIVARIATE_DATA_T,
+    STRESS_LINEAR_CHAIN_DATA_C,
+    STRESS_NONLINEAR_BIVARIATE_DATA_L,
+    STRESS_NONLINEAR_BIVARIATE_DATA_T,
+)
 
 BIVARIATE_SYNTHETIC_SIGNALS_DATA = {
     'Varying Length Linear Bivariate': LINEAR_BIVARIATE_DATA_L,
@@ -20,3 +28,19 @@ TRIVARIATE_SYNTHETIC_SIGNALS_DATA = {
     'Varying az Linear Trivariate': LINEAR_TRIVARIATE_DATA_Z,
     'Varying ax Linear Trivariate': LINEAR_TRIVARIATE_DATA_YX,
 }
+
+STRESS_BIVARIATE_SYNTHETIC_SIGNALS_DATA = {
+    'Stress Varying Length Linear Bivariate': STRESS_LINEAR_BIVARIATE_DATA_L,
+    'Stress Varying Levels Linear Bivariate': STRESS_LINEAR_BIVARIATE_DATA_T,
+    'Stress Varying Length Nonlinear Bivariate': STRESS_NONLINEAR_BIVARIATE_DATA_L,
+    'Stress Varying Levels Nonlinear Bivariate': STRESS_NONLINEAR_BIVARIATE_DATA_T,
+}
+
+STRESS_MULTIVARIATE_SYNTHETIC_SIGNALS_DATA = {
+    'Stress Varying Channels Linear Chain': STRESS_LINEAR_CHAIN_DATA_C,
+}
+
+# state matrices of the multivariate datasets by condition, the known coupling to check estimates against
+STRESS_MULTIVARIATE_STATE_MATRICES = {
+    'Stress Varying Channels Linear Chain': STRESS_CHAIN_STATE_MATRICES,
+}
@@ -1,3 +1,4 @@
 DEFAULT_N_SKIP = 3000
 REPETITIONS = 100
 DEFAULT_SIGNAL_LENGTH = 200
+STRESS_REPETITIONS = 10
@@ -0,0 +1,78 @@
+from collections.abc import Iterator, Sequence
+from functools import partial
+from pathlib import Path
+from typing import overload
+
+from src.common.constants import SYNTHETIC_DATA_CACHE_DIRECTORY_PATH
+from src.common.mytypes import ArrayDataDict, LazySubjectData, SubjectData
+from src.synthetic.common import REPETITIONS
+from src.synthetic.store import SeededGenerator, SyntheticStore
+
+
+class SyntheticDataset(Sequence[SubjectData]):
+    """
+    Repetitions of synthetic processes under several conditions, generated on demand.
+
+    Repetition i is a subject {'id': i, <condition>: signals generated with seed=i}, where each condition
+    is generated on its first access. With memoize, generated subjects are kept, so repeated passes
+    over the dataset generate every series once.
+
+    With a cache directory, all repetitions of a condition are generated together on first access
+    and kept in a SyntheticStore, so later runs map them from disk instead of generating them.
+    """
+
+    def __init__(
+        self,
+        conditions: dict[str, SeededGenerator],
+        repetitions: int = REPETITIONS,
+        memoize: bool = True,
+        cache_directory: Path | None = SYNTHETIC_DATA_CACHE_DIRECTORY_PATH,
+    ) -> None:
+        """
+        conditions: generators of each condition, called with the keyword argument `seed`.
+        cache_directory: directory of the SyntheticStore, None disables storing generated series.
+        """
+        self.conditions = conditions
+        self.repetitions = repetitions
+        self.memoize = memoize
+        self._store = SyntheticStore(cache_directory) if cache_directory is not None else None
+        self._subjects: dict[int, LazySubjectData] = {}
+
+    @overload
+    def __getitem__(self, index: int) -> SubjectData: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[SubjectData]: ...
+
+    def __getitem__(self, index: int | slice) -> SubjectData | list[SubjectData]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.repetitions))]
+        if not -self.repetitions <= index < self.repetitions:
+            raise IndexError(f'Repetition {index} out of range of {self.repetitions}')
+        index %= self.repetitions
+
+        if (subject := self._subjects.get(index)) is not None:
+            return subject
+        subject = LazySubjectData(
+            index, {condition: self._get_loader(generator, index) for condition, generator in self.conditions.items()}
+        )
+        if self.memoize:
+            self._subjects[index] = subject
+        return subject
+
+    def __len__(self) -> int:
+        return self.repetitions
+
+    def __iter__(self) -> Iterator[SubjectData]:
+        return (self[i] for i in range(self.repetitions))
+
+    def _get_loader(self, generator: SeededGenerator, index: int) -> partial[ArrayDataDict]:
+        if self._store is None:
+            return partial(generator, seed=index)
+        return partial(_load_stored_repetition, self._store, generator, range(self.repetitions), index)
+
+
+def _load_stored_repetition(
+    store: SyntheticStore, generator: SeededGenerator, seeds: Sequence[int], index: int
+) -> ArrayDataDict:
+    return {name: block[index] for name, block in store.load(generator, seeds).items()}
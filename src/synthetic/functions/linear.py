@@ -1,4 +1,7 @@
+from collections.abc import Sequence
+
 import numpy as np
+import scipy.signal
 
 from src.common.mytypes import FloatArray
 from src.synthetic.common import DEFAULT_N_SKIP
@@ -15,35 +18,54 @@ def generate_bivariate_ar(
     Generates a linear bivariate process based on Faes et al.
     x_n = -0.5x_{n-1} + e_xn
     y_n = -0.5y_{n-1} + ax_{n-1} + e_yn
+
+    Single repetition of `generate_bivariate_ar_batch`.
     """
-    rng = np.random.default_rng(seed)
-    n_total = length + n_skip
+    signals = generate_bivariate_ar_batch(length, a, [seed], snr=snr, n_skip=n_skip)
+    return {name: signal[0] for name, signal in signals.items()}
 
-    X = np.zeros(n_total)
-    Y = np.zeros(n_total)
 
-    ex = rng.standard_normal(n_total)
-    ey = rng.standard_normal(n_total)
+def generate_bivariate_ar_batch(
+    length: int,
+    a: float,
+    seeds: Sequence[int],
+    snr: int | None = None,
+    n_skip: int = DEFAULT_N_SKIP,
+) -> dict[str, FloatArray]:
+    """
+    Generates repetitions of the linear bivariate process as (len(seeds), length) arrays,
+    filtering the innovations of all repetitions at once with scipy.signal.lfilter.
+
+    Repetition i draws from np.random.default_rng(seeds[i]), in the same order as a sample-by-sample
+    simulation (e_x, e_y, then the measurement noise), so it is reproducible per seed and independent
+    of the other seeds. The filtered series equal the sample-by-sample recursion up to floating-point
+    rounding of the order of additions (~1e-15), x exactly.
+    """
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    n_total = length + n_skip
+    ex, ey = _draw_innovations(rngs, n_total, n_signals=2)
 
-    for n in range(1, n_total):
-        X[n] = -0.5 * X[n - 1] + ex[n]
-        Y[n] = -0.5 * Y[n - 1] + a * X[n - 1] + ey[n]
+    # the recursion starts from x_0 = y_0 = 0, so the innovations at n = 0 are not used
+    ex[:, 0] = 0
+    X = scipy.signal.lfilter([1.0], [1.0, 0.5], ex, axis=-1)
+    ey[:, 0] = 0
+    ey[:, 1:] += a * X[:, :-1]
+    Y = scipy.signal.lfilter([1.0], [1.0, 0.5], ey, axis=-1)
 
-    X, Y = X[n_skip:], Y[n_skip:]
+    X, Y = X[:, n_skip:], Y[:, n_skip:]
 
     if snr is None:
         return {'x': X, 'y': Y}
 
-    power_x = np.var(X)
-    power_y = np.var(Y)
-
-    noise_var_x = power_x / (10 ** (snr / 10))
-    noise_var_y = power_y / (10 ** (snr / 10))
-
-    x_noisy = X + rng.normal(0, np.sqrt(noise_var_x), length)
-    y_noisy = Y + rng.normal(0, np.sqrt(noise_var_y), length)
+    noise_std_x = np.sqrt(np.var(X, axis=-1) / (10 ** (snr / 10)))
+    noise_std_y = np.sqrt(np.var(Y, axis=-1) / (10 ** (snr / 10)))
+    noise_x = np.empty_like(X)
+    noise_y = np.empty_like(Y)
+    for i, rng in enumerate(rngs):
+        noise_x[i] = rng.normal(0, noise_std_x[i], length)
+        noise_y[i] = rng.normal(0, noise_std_y[i], length)
 
-    return {'x': x_noisy, 'y': y_noisy}
+    return {'x': X + noise_x, 'y': Y + noise_y}
 
 
 def generate_trivariate_ar(
@@ -72,24 +94,99 @@ def generate_trivariate_ar(
     Returns
     -------
     dict[str, FloatArray]
+        Single repetition of `generate_trivariate_ar_batch`.
     """
-    rng = np.random.default_rng(seed)
-    n_plus_skip = n + n_skip
-    X = np.zeros(n_plus_skip)
-    Y = np.zeros(n_plus_skip)
-    Z = np.zeros(n_plus_skip)
+    signals = generate_trivariate_ar_batch(n, az, ax, [seed], n_skip=n_skip)
+    return {name: signal[0] for name, signal in signals.items()}
 
-    epsilon_X = rng.normal(0, 1, n_plus_skip)
-    epsilon_Y = rng.normal(0, 1, n_plus_skip)
-    epsilon_Z = rng.normal(0, 1, n_plus_skip)
 
-    X[0] = epsilon_X[0]
-    Y[0] = epsilon_Y[0]
-    Z[0] = epsilon_Z[0]
+def generate_trivariate_ar_batch(
+    n: int, az: float, ax: float, seeds: Sequence[int], n_skip: int = DEFAULT_N_SKIP
+) -> dict[str, FloatArray]:
+    """
+    Generates repetitions of the trivariate process as (len(seeds), n) arrays.
+
+    The process is the state-space model s_t = A s_{t-1} + e_t of the state s = (Z, X, Y),
+    simulated for all repetitions at once by `simulate_triangular_var`.
+    Seeding follows `generate_bivariate_ar_batch` (innovations e_X, e_Y, e_Z drawn per seed),
+    z equals the sample-by-sample recursion exactly, x and y up to rounding.
+    """
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    epsilon_X, epsilon_Y, epsilon_Z = _draw_innovations(rngs, n + n_skip, n_signals=3, normal=True)
 
-    for t in range(1, n_plus_skip):
-        Z[t] = 0.8 * Z[t - 1] + epsilon_Z[t]
-        X[t] = 0.5 * X[t - 1] + az * Z[t - 1] + epsilon_X[t]
-        Y[t] = 0.5 * Y[t - 1] + ax * X[t - 1] + az * Z[t - 1] + epsilon_Y[t]
+    A = np.array(
+        [
+            [0.8, 0, 0],
+            [az, 0.5, 0],
+            [az, ax, 0.5],
+        ]
+    )
+    Z, X, Y = simulate_triangular_var(A, np.stack([epsilon_Z, epsilon_X, epsilon_Y], axis=1))
+    return {'x': X[:, n_skip:], 'y': Y[:, n_skip:], 'z': Z[:, n_skip:]}
 
-    return {'x': X[n_skip:], 'y': Y[n_skip:], 'z': Z[n_skip:]}
+
+def simulate_triangular_var(A: FloatArray, innovations: FloatArray) -> FloatArray:
+    """
+    Simulates the VAR(1) state-space model s_t = A s_{t-1} + e_t with lower triangular A,
+    from s_0 = e_0, for innovations of shape (repetitions, k, N). Returns signals of shape (k, repetitions, N).
+
+    As every state variable depends only on its own past and the past of the preceding ones,
+    each is one IIR filter (lfilter) of its innovations plus the lagged preceding signals.
+    """
+    if np.any(np.triu(A, k=1)):
+        raise ValueError('State matrix must be lower triangular')
+    n_signals = A.shape[0]
+    signals = np.empty((n_signals, innovations.shape[0], innovations.shape[2]))
+    for i in range(n_signals):
+        driving = innovations[:, i, :].copy()
+        for j in range(i):
+            if A[i, j] != 0:
+                driving[:, 1:] += A[i, j] * signals[j][:, :-1]
+        signals[i] = scipy.signal.lfilter([1.0], [1.0, -A[i, i]], driving, axis=-1)
+    return signals
+
+
+def _draw_innovations(
+    rngs: list[np.random.Generator], n_total: int, n_signals: int, normal: bool = False
+) -> list[FloatArray]:
+    innovations: list[FloatArray] = [np.empty((len(rngs), n_total)) for _ in range(n_signals)]
+    for i, rng in enumerate(rngs):
+        for signal_innovations in innovations:
+            signal_innovations[i] = rng.normal(0, 1, n_total) if normal else rng.standard_normal(n_total)
+    return innovations
+
+
+def get_chain_state_matrix(n_channels: int, coupling: float, self_coupling: float = 0.5) -> FloatArray:
+    """
+    State matrix of a chain of AR(1) processes x1 -> x2 -> ... -> x<n_channels>:
+    every channel depends on its own past (self_coupling) and on the past of the preceding channel (coupling).
+    A[i, j] != 0 is the known direct coupling of channel j to channel i; couplings along the chain
+    to later channels are indirect, so they vanish when conditioned on the channels in between.
+    """
+    return np.diag(np.full(n_channels, self_coupling)) + np.diag(np.full(n_channels - 1, coupling), k=-1)
+
+
+def generate_chain_ar(
+    length: int, n_channels: int, coupling: float, seed: int, n_skip: int = DEFAULT_N_SKIP
+) -> dict[str, FloatArray]:
+    """
+    Generates a chain of coupled AR(1) processes {'x1', ..., 'x<n_channels>'} with the state matrix
+    of `get_chain_state_matrix`.
+
+    Single repetition of `generate_chain_ar_batch`.
+    """
+    signals = generate_chain_ar_batch(length, n_channels, coupling, [seed], n_skip=n_skip)
+    return {name: signal[0] for name, signal in signals.items()}
+
+
+def generate_chain_ar_batch(
+    length: int, n_channels: int, coupling: float, seeds: Sequence[int], n_skip: int = DEFAULT_N_SKIP
+) -> dict[str, FloatArray]:
+    """
+    Generates repetitions of the chain of coupled AR(1) processes as (len(seeds), length) arrays.
+    Repetition i draws the innovations of x1, ..., x<n_channels> in order from np.random.default_rng(seeds[i]).
+    """
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    innovations = _draw_innovations(rngs, length + n_skip, n_signals=n_channels)
+    signals = simulate_triangular_var(get_chain_state_matrix(n_channels, coupling), np.stack(innovations, axis=1))
+    return {f'x{channel + 1}': signal[:, n_skip:] for channel, signal in enumerate(signals)}
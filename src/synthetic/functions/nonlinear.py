@@ -1,3 +1,5 @@
+from collections.abc import Sequence
+
 import numpy as np
 
 from src.common.mytypes import FloatArray
@@ -14,22 +16,41 @@ def generate_nonlinear_bivariate_process(
     Generates a nonlinear bivariate process based on Lee et al.
     x_n = s_xn + noise_xn
     y_n = (b * x_{n-tau})^2 + noise_yn
+
+    Single repetition of `generate_nonlinear_bivariate_process_batch`.
     """
-    rng = np.random.default_rng(seed)
-    n_total = length + n_skip
+    signals = generate_nonlinear_bivariate_process_batch(length, [seed], b, n_skip=n_skip)
+    return {name: signal[0] for name, signal in signals.items()}
 
-    sx = rng.normal(10, 1, n_total)
 
-    noise_x = rng.laplace(0, 1, n_total)
-    noise_y = rng.laplace(0, 1, n_total)
+def generate_nonlinear_bivariate_process_batch(
+    length: int,
+    seeds: Sequence[int],
+    b: float,
+    n_skip: int = DEFAULT_N_SKIP,
+) -> dict[str, FloatArray]:
+    """
+    Generates repetitions of the nonlinear bivariate process as (len(seeds), length) arrays.
+    Y depends only on lagged X, so it is computed for all samples at once from the shifted X.
+    Repetition i draws from np.random.default_rng(seeds[i]) as the sample-by-sample simulation,
+    and equals it up to rounding of the vectorized square (1 ulp).
+    """
+    n_total = length + n_skip
+    sx = np.empty((len(seeds), n_total))
+    noise_x = np.empty((len(seeds), n_total))
+    noise_y = np.empty((len(seeds), n_total))
+    for i, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        sx[i] = rng.normal(10, 1, n_total)
+        noise_x[i] = rng.laplace(0, 1, n_total)
+        noise_y[i] = rng.laplace(0, 1, n_total)
 
     X = sx + noise_x
 
-    Y = np.zeros(n_total)
-    for n in range(1, n_total):
-        Y[n] = (b * X[n - 1]) ** 2 + noise_y[n]
+    Y = np.zeros((len(seeds), n_total))
+    Y[:, 1:] = (b * X[:, :-1]) ** 2 + noise_y[:, 1:]
 
     return {
-        'x': X[n_skip:],
-        'y': Y[n_skip:],
+        'x': X[:, n_skip:],
+        'y': Y[:, n_skip:],
     }
@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.common.mytypes import FloatArray
+from src.synthetic.common import DEFAULT_N_SKIP
+from src.synthetic.functions.linear import generate_bivariate_ar
+from src.synthetic.functions.nonlinear import generate_nonlinear_bivariate_process
+
+
+def quantize(signal: FloatArray, levels: int) -> FloatArray:
+    """
+    Maps the signal onto `levels` equally spaced values between its minimum and maximum (the bin indices),
+    like a low-resolution A/D converter, so that long signals consist mostly of tied values.
+    """
+    minimum, maximum = np.min(signal), np.max(signal)
+    if maximum == minimum:
+        return np.zeros_like(signal)
+    return np.minimum(np.floor((signal - minimum) / (maximum - minimum) * levels), levels - 1)
+
+
+def generate_tied_bivariate_ar(
+    length: int,
+    a: float,
+    levels: int,
+    seed: int,
+    n_skip: int = DEFAULT_N_SKIP,
+) -> dict[str, FloatArray]:
+    """
+    Generates the linear bivariate process of `generate_bivariate_ar`, with both signals quantized to `levels` values.
+    """
+    signals = generate_bivariate_ar(length, a, seed, n_skip=n_skip)
+    return {name: quantize(signal, levels) for name, signal in signals.items()}
+
+
+def generate_tied_nonlinear_bivariate_process(
+    length: int,
+    b: float,
+    levels: int,
+    seed: int,
+    n_skip: int = DEFAULT_N_SKIP,
+) -> dict[str, FloatArray]:
+    """
+    Generates the nonlinear bivariate process of `generate_nonlinear_bivariate_process`,
+    with both signals quantized to `levels` values.
+    """
+    signals = generate_nonlinear_bivariate_process(length, seed, b, n_skip=n_skip)
+    return {name: quantize(signal, levels) for name, signal in signals.items()}
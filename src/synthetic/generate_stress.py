@@ -0,0 +1,60 @@
+from functools import partial
+
+from src.common.mytypes import FloatArray
+from src.synthetic.common import STRESS_REPETITIONS
+from src.synthetic.dataset import SyntheticDataset
+from src.synthetic.functions.linear import generate_bivariate_ar, generate_chain_ar, get_chain_state_matrix
+from src.synthetic.functions.nonlinear import generate_nonlinear_bivariate_process
+from src.synthetic.functions.ties import generate_tied_bivariate_ar, generate_tied_nonlinear_bivariate_process
+
+# Known coupling of every stress dataset:
+# bivariate conditions couple x -> y with a (linear) or b (nonlinear) and have no coupling y -> x,
+# chain conditions couple x<k> -> x<k+1> directly, see STRESS_CHAIN_STATE_MATRICES.
+
+_DEFAULT_A = 0.5
+_DEFAULT_B = 0.25
+_DEFAULT_COUPLING = 0.4
+_DEFAULT_STRESS_LENGTH = 10_000
+
+stress_lengths = [10_000, 100_000, 1_000_000]
+STRESS_LINEAR_BIVARIATE_DATA_L = SyntheticDataset(
+    {
+        f'Length={signal_length}': partial(generate_bivariate_ar, signal_length, _DEFAULT_A)
+        for signal_length in stress_lengths
+    },
+    repetitions=STRESS_REPETITIONS,
+)
+STRESS_NONLINEAR_BIVARIATE_DATA_L = SyntheticDataset(
+    {
+        f'Length={signal_length}': partial(generate_nonlinear_bivariate_process, signal_length, b=_DEFAULT_B)
+        for signal_length in stress_lengths
+    },
+    repetitions=STRESS_REPETITIONS,
+)
+
+n_channels = [2, 4, 8]
+STRESS_LINEAR_CHAIN_DATA_C = SyntheticDataset(
+    {f'Channels={n}': partial(generate_chain_ar, _DEFAULT_STRESS_LENGTH, n, _DEFAULT_COUPLING) for n in n_channels},
+    repetitions=STRESS_REPETITIONS,
+)
+STRESS_CHAIN_STATE_MATRICES: dict[str, FloatArray] = {
+    f'Channels={n}': get_chain_state_matrix(n, _DEFAULT_COUPLING) for n in n_channels
+}
+
+levels = [256, 16, 4]
+STRESS_LINEAR_BIVARIATE_DATA_T = SyntheticDataset(
+    {
+        f'Levels={n_levels}': partial(generate_tied_bivariate_ar, _DEFAULT_STRESS_LENGTH, _DEFAULT_A, n_levels)
+        for n_levels in levels
+    },
+    repetitions=STRESS_REPETITIONS,
+)
+STRESS_NONLINEAR_BIVARIATE_DATA_T = SyntheticDataset(
+    {
+        f'Levels={n_levels}': partial(
+            generate_tied_nonlinear_bivariate_process, _DEFAULT_STRESS_LENGTH, _DEFAULT_B, n_levels
+        )
+        for n_levels in levels
+    },
+    repetitions=STRESS_REPETITIONS,
+)
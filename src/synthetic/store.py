@@ -0,0 +1,165 @@
+import hashlib
+import inspect
+import json
+import os
+from collections.abc import Callable, Sequence
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from src.common.logger import logger
+from src.common.mytypes import ArrayDataDict, FloatArray
+from src.synthetic.common import DEFAULT_N_SKIP
+from src.synthetic.functions.linear import (
+    generate_bivariate_ar,
+    generate_bivariate_ar_batch,
+    generate_chain_ar,
+    generate_chain_ar_batch,
+    generate_trivariate_ar,
+    generate_trivariate_ar_batch,
+)
+from src.synthetic.functions.nonlinear import (
+    generate_nonlinear_bivariate_process,
+    generate_nonlinear_bivariate_process_batch,
+)
+
+type SeededGenerator = Callable[..., dict[str, FloatArray]]
+
+_METADATA_FILE_NAME = 'metadata.json'
+_KEY_LENGTH = 16
+# bump when generated series change for the same parameters, so existing entries are not reused
+_STORE_VERSION = 1
+# per-seed generators and their counterparts taking the same arguments with `seeds` instead of `seed`
+_BATCH_GENERATORS: dict[Callable[..., Any], Callable[..., dict[str, FloatArray]]] = {
+    generate_bivariate_ar: generate_bivariate_ar_batch,
+    generate_trivariate_ar: generate_trivariate_ar_batch,
+    generate_chain_ar: generate_chain_ar_batch,
+    generate_nonlinear_bivariate_process: generate_nonlinear_bivariate_process_batch,
+}
+
+
+class SyntheticStore:
+    """
+    Content-addressed store of synthetic series: repetitions of a generator for a sequence of seeds
+    are kept as one (repetitions, length) .npy block per signal and reloaded memory-mapped,
+    so parallel workers reading the same entry share its pages.
+
+    Entries are keyed by the generator function, all its arguments except the seed (defaults included),
+    the seeds and DEFAULT_N_SKIP. Generated series are deterministic, so entries never become stale
+    unless the generators change.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._blocks: dict[str, ArrayDataDict] = {}
+
+    def load(self, generator: SeededGenerator, seeds: Sequence[int]) -> ArrayDataDict:
+        """
+        Returns the signals of all seeds as (len(seeds), length) blocks, generated and stored on first use.
+        """
+        description = get_generator_description(generator, seeds)
+        key = hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()[:_KEY_LENGTH]
+        if (blocks := self._blocks.get(key)) is not None:
+            return blocks
+        if (blocks := self._read(key, description)) is None:
+            blocks = self._write(key, description, generate_block(generator, seeds))
+        self._blocks[key] = blocks
+        return blocks
+
+    def __getstate__(self) -> dict[str, Any]:
+        # opened blocks are not sent to other processes, they map the files again
+        return {**self.__dict__, '_blocks': {}}
+
+    def _read(self, key: str, description: dict[str, Any]) -> ArrayDataDict | None:
+        entry_directory = self.directory / key
+        metadata_path = entry_directory / _METADATA_FILE_NAME
+        if not metadata_path.exists():
+            return None
+        try:
+            metadata = json.loads(metadata_path.read_text(encoding='utf-8'))
+            if metadata['description'] != description:
+                logger.warning(f'Key collision in synthetic store entry {key}, regenerating')
+                return None
+            return {name: np.load(entry_directory / f'{name}.npy', mmap_mode='r') for name in metadata['signals']}
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f'Failed to read synthetic store entry {key}\n {e}')
+            return None
+
+    def _write(self, key: str, description: dict[str, Any], blocks: ArrayDataDict) -> ArrayDataDict:
+        """
+        The metadata is written last, so an interrupted write leaves an entry that is not valid.
+        Concurrent writers of the same entry write identical files, each replacing them atomically.
+        """
+        entry_directory = self.directory / key
+        try:
+            entry_directory.mkdir(parents=True, exist_ok=True)
+            for name, block in blocks.items():
+                _atomic_save(entry_directory / f'{name}.npy', block)
+            metadata_path = entry_directory / _METADATA_FILE_NAME
+            temporary_path = metadata_path.with_suffix(f'.{os.getpid()}.tmp')
+            temporary_path.write_text(
+                json.dumps({'description': description, 'signals': list(blocks)}), encoding='utf-8'
+            )
+            temporary_path.replace(metadata_path)
+        except OSError as e:
+            logger.warning(f'Failed to store synthetic series {description}\n {e}')
+            return blocks
+        return self._read(key, description) or blocks
+
+
+def generate_block(generator: SeededGenerator, seeds: Sequence[int]) -> ArrayDataDict:
+    """
+    Generates the signals of all seeds as (len(seeds), length) blocks, with the batch counterpart
+    of the generator if it has one (same series, per seed), otherwise stacking repetitions of it.
+    """
+    function, args, keywords = _unwrap_partial(generator)
+    if (batch_generator := _BATCH_GENERATORS.get(function)) is not None:
+        bound = inspect.signature(function).bind_partial(*args, **keywords)
+        arguments = {name: value for name, value in bound.arguments.items() if name != 'seed'}
+        return batch_generator(**arguments, seeds=list(seeds))
+
+    repetitions = [generator(seed=seed) for seed in seeds]
+    return {name: np.stack([signals[name] for signals in repetitions]) for name in repetitions[0]}
+
+
+def get_generator_description(generator: SeededGenerator, seeds: Sequence[int]) -> dict[str, Any]:
+    """
+    Describes a (possibly partially applied) generator by the qualified name of the function
+    and all bound arguments, with defaults, except the seed.
+    """
+    function, args, keywords = _unwrap_partial(generator)
+    bound = inspect.signature(function).bind_partial(*args, **keywords)
+    bound.apply_defaults()
+    arguments = {name: _to_json_value(value) for name, value in bound.arguments.items() if name != 'seed'}
+    return {
+        'generator': f'{function.__module__}.{function.__qualname__}',
+        'arguments': arguments,
+        'seeds': [int(seed) for seed in seeds],
+        'default_n_skip': DEFAULT_N_SKIP,
+        'version': _STORE_VERSION,
+    }
+
+
+def _unwrap_partial(generator: SeededGenerator) -> tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]:
+    if not isinstance(generator, partial):
+        return generator, (), {}
+    function, args, keywords = _unwrap_partial(generator.func)
+    return function, (*args, *generator.args), {**keywords, **generator.keywords}
+
+
+def _to_json_value(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_to_json_value(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise ValueError(f'Generator argument {value!r} cannot be part of a store key')
+
+
+def _atomic_save(path: Path, values: FloatArray) -> None:
+    temporary_path = path.with_suffix(f'.{os.getpid()}.tmp.npy')
+    np.save(temporary_path, np.ascontiguousarray(values))
+    temporary_path.replace(path)
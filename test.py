@@ -49,7 +49,7 @@ partitions = dv_partition_nd(np.column_stack([rankedX, rankedY]))
 dvp2d = plot_2d_partitions(partitions, rankedX, rankedY, 'Ranked noise X', 'Ranked noise Y')
 
 # %%
-data_loader = BaroreflexDataLoader()
+data_loader = BaroreflexDataLoader(lazy=True)
 data_processor = BaroreflexDataProcessor()
 
 # %%